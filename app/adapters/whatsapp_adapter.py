@@ -3,6 +3,7 @@ from __future__ import annotations
 
 from typing import Any
 
+from app.domain.models import Recommendation
 from app.domain.schemas import ChatRequest, ChatResponse
 
 MAX_WHATSAPP_LENGTH = 1500
@@ -25,7 +26,7 @@ def format_twilio_response(response: ChatResponse) -> str:
     lines = [response.message]
     if response.recommendations:
         recommendation_lines = [
-            f"- {rec.car.make} {rec.car.model} {rec.car.year} | ${rec.car.price:,.0f}"
+            f"- {rec.car.make} {rec.car.model} {rec.car.year} | ${rec.car.price:,.0f}" + _lowest_payment(rec)
             for rec in response.recommendations
         ]
         lines.append("Recomendaciones:\n" + "\n".join(recommendation_lines))
@@ -40,6 +41,13 @@ def format_twilio_response(response: ChatResponse) -> str:
     return _truncate(response_text)
 
 
+def _lowest_payment(recommendation: Recommendation) -> str:
+    if not recommendation.payment_options:
+        return ""
+    option = min(recommendation.payment_options, key=lambda item: item.monthly_payment)
+    return f" | desde ${option.monthly_payment:,.0f}/mes a {option.months} meses"
+
+
 def _truncate(text: str) -> str:
     if len(text) <= MAX_WHATSAPP_LENGTH:
         return text
@@ -9,9 +9,33 @@ class Settings(BaseSettings):
 
     openai_api_key: str | None = None
     csv_catalog_path: str | None = None
+    catalog_snapshot_dir: str | None = None
+    catalog_watch_interval_seconds: float = 0.0
+    catalog_spool_dir: str | None = None
+    admin_token: str | None = None
     value_proposition_path: str | None = None
+    knowledge_base_token_budget: int = 250
+    knowledge_base_intents: list[str] = ["faq", "financing"]
     openai_model: str = "gpt-4o-mini"
+    openai_timeout_seconds: float = 30.0
+    sync_worker_threads: int = 8
+    batch_concurrency: int = 16
+    single_call_mode: bool = False
+    entity_fuzzy_threshold: float = 0.8
+    intent_fast_path_threshold: float = 0.85
+    intent_training_path: str | None = None
+    intent_cache_size: int = 4096
+    intent_cache_ttl_seconds: int = 86400
+    intent_cache_shared: bool = True
+    reply_cache_enabled: bool = False
+    reply_cache_size: int = 1024
+    reply_cache_ttl_seconds: int = 600
+    reply_cache_shared: bool = True
     redis_url: str = "redis://localhost:6379/0"
+    redis_max_connections: int = 50
+    redis_socket_timeout_seconds: float = 2.0
+    redis_connect_timeout_seconds: float = 2.0
+    redis_health_check_interval_seconds: int = 30
 
     class Config:
         env_file = ".env"
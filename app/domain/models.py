@@ -1,7 +1,7 @@
 """Domain models for the Kavak commercial bot."""
 from __future__ import annotations
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class Car(BaseModel):
@@ -22,11 +22,19 @@ class Car(BaseModel):
     # TODO: Revisit attributes once the final CSV schema (trim, transmission, location) is confirmed.
 
 
+class PaymentOption(BaseModel):
+    """Monthly payment for one financing term."""
+
+    months: int
+    monthly_payment: float
+
+
 class Recommendation(BaseModel):
     """Pair a recommended car with the reasoning behind it."""
 
     car: Car
     reason: str
+    payment_options: list[PaymentOption] = Field(default_factory=list)
 
 
 class FinancingPlan(BaseModel):
@@ -1,7 +1,7 @@
 """Request/response schemas for public API endpoints."""
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field
 
@@ -32,3 +32,79 @@ class ChatResponse(BaseModel):
     message: str
     recommendations: list[Recommendation] = Field(default_factory=list)
     financing_plan: FinancingPlan | None = None
+
+
+class CatalogStatus(BaseModel):
+    """Version and size of the catalog currently being served."""
+
+    version: int
+    rows: int
+
+
+class FacetCount(BaseModel):
+    """Units in stock for one facet value."""
+
+    value: str | int
+    count: int
+
+
+class RangeFacetCount(BaseModel):
+    """Units in stock whose value falls in `[min, max)`."""
+
+    min: float
+    max: float
+    count: int
+
+
+class CatalogFacetsResponse(CatalogStatus):
+    """Inventory counts per make, model (grouped by make), year and price/km range."""
+
+    makes: list[FacetCount]
+    models: dict[str, list[FacetCount]]
+    years: list[FacetCount]
+    price_ranges: list[RangeFacetCount]
+    km_ranges: list[RangeFacetCount]
+
+
+class CatalogReloadResponse(CatalogStatus):
+    """Result of swapping in a freshly parsed catalog."""
+
+    source: str
+    elapsed_ms: float
+    added: list[str] = Field(default_factory=list)
+    removed: list[str] = Field(default_factory=list)
+    changed: list[str] = Field(default_factory=list)
+
+
+class InventoryDelta(BaseModel):
+    """Single inventory change keyed by `stock_id`.
+
+    `upsert` creates or overwrites a unit, `update` changes fields of an existing
+    unit (typically price or km) and `delete` removes a sold unit.
+    """
+
+    op: Literal["upsert", "update", "delete"]
+    stock_id: str
+    km: int | None = Field(default=None, ge=0)
+    price: float | None = Field(default=None, ge=0)
+    make: str | None = None
+    model: str | None = None
+    year: int | None = None
+    version: str | None = None
+    bluetooth: bool | None = None
+    length_mm: float | None = None
+    width_mm: float | None = None
+    height_mm: float | None = None
+    car_play: bool | None = None
+
+
+class InventoryDeltaResponse(BaseModel):
+    """Outcome of applying a batch of inventory deltas."""
+
+    version: int
+    rows: int
+    upserted: int
+    updated: int
+    deleted: int
+    missing: list[str] = Field(default_factory=list)
+    elapsed_ms: float
@@ -0,0 +1,52 @@
+"""Mutable per-turn state carried from the API edge through parser, store and agent."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.domain.schemas import ChatRequest, FinancingInput
+
+
+@dataclass(slots=True)
+class TurnContext:
+    """One chat turn, validated once as a `ChatRequest` and then filled in place.
+
+    `financing_provided` remembers whether the client sent financing data itself,
+    which decides whether missing financing fields are worth asking for.
+    """
+
+    user_id: str
+    message: str
+    channel: str | None = None
+    preferences: dict[str, Any] = field(default_factory=dict)
+    financing: FinancingInput | None = None
+    financing_provided: bool = False
+
+    @classmethod
+    def from_request(cls, request: ChatRequest) -> TurnContext:
+        return cls(
+            user_id=request.user_id,
+            message=request.message,
+            channel=request.channel,
+            preferences=dict(request.preferences or {}),
+            financing=request.financing,
+            financing_provided=request.financing is not None,
+        )
+
+    def to_record(self) -> dict[str, Any]:
+        """Plain-data view for the conversation history, shaped like `ChatRequest.model_dump()`."""
+        financing = self.financing
+        return {
+            "user_id": self.user_id,
+            "message": self.message,
+            "channel": self.channel,
+            "preferences": self.preferences or None,
+            "financing": (
+                {"car_price": financing.car_price, "down_payment": financing.down_payment, "years": financing.years}
+                if financing
+                else None
+            ),
+        }
+
+    def to_request(self) -> ChatRequest:
+        return ChatRequest.model_construct(**{**self.to_record(), "financing": self.financing})
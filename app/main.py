@@ -1,21 +1,40 @@
 """FastAPI application entry point."""
+import asyncio
 import json
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import AsyncIterator
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi import Request
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from redis.exceptions import RedisError
 
 from app.config import get_settings
-from app.domain.schemas import ChatRequest, ChatResponse
+from app.domain.schemas import (
+    CatalogFacetsResponse,
+    CatalogReloadResponse,
+    CatalogStatus,
+    ChatRequest,
+    ChatResponse,
+    FacetCount,
+    InventoryDeltaResponse,
+    RangeFacetCount,
+)
+from app.domain.turn import TurnContext
 from app.adapters.whatsapp_adapter import format_twilio_response, parse_twilio_payload
-from app.services.agent_service import CommercialAgentService
-from app.services.catalog_service import CatalogService
+from app.services.agent_service import CatalogContext, CommercialAgentService
+from app.services.cache import TieredCache
+from app.services.catalog_service import CatalogLoadReport, CatalogService, InventoryDeltaReport
+from app.services.catalog_watcher import CatalogWatcher
+from app.services.inventory_deltas import parse_ndjson_deltas
 from app.services.message_parser import MessageParser
-from app.services.conversation_store import ConversationStore
-from app.services.intent_classifier import IntentClassifier
+from app.services.metrics import CURRENT_ENDPOINT, METRICS, TURN_STATS, start_turn
+from app.services.conversation_store import AsyncConversationStore, ConversationSession
+from app.services.intent_classifier import Intent, IntentClassifier
 from app.services.option_builder import OptionBuilder
 
 LOGGER = logging.getLogger("kavak.bot")
@@ -23,90 +42,207 @@ LOGGER.setLevel(logging.INFO)
 
 app = FastAPI(title="Kavak Commercial Bot")
 settings = get_settings()
-catalog_service = CatalogService()
+catalog_service = CatalogService(snapshot_dir=settings.catalog_snapshot_dir)
+conversation_store = AsyncConversationStore(
+    settings.redis_url,
+    max_connections=settings.redis_max_connections,
+    socket_timeout=settings.redis_socket_timeout_seconds,
+    connect_timeout=settings.redis_connect_timeout_seconds,
+    health_check_interval=settings.redis_health_check_interval_seconds,
+)
+reply_cache = (
+    TieredCache(
+        "reply",
+        "v1",
+        settings.reply_cache_size,
+        settings.reply_cache_ttl_seconds,
+        conversation_store.client if settings.reply_cache_shared else None,
+    )
+    if settings.reply_cache_enabled
+    else None
+)
 agent_service = CommercialAgentService(
     catalog_service=catalog_service,
     settings=settings,
     knowledge_base_path=settings.value_proposition_path,
+    reply_cache=reply_cache,
+)
+message_parser = MessageParser(catalog_service, settings.entity_fuzzy_threshold)
+intent_classifier = IntentClassifier(
+    settings.openai_api_key,
+    settings.openai_model,
+    settings.openai_timeout_seconds,
+    fast_path_threshold=settings.intent_fast_path_threshold,
+    training_path=settings.intent_training_path,
+    cache_size=settings.intent_cache_size,
+    cache_ttl_seconds=settings.intent_cache_ttl_seconds,
+    cache_redis=conversation_store.client if settings.intent_cache_shared else None,
 )
-message_parser = MessageParser(catalog_service)
-conversation_store = ConversationStore(settings.redis_url)
-intent_classifier = IntentClassifier(settings.openai_api_key, settings.openai_model)
 option_builder = OptionBuilder(catalog_service)
+catalog_watcher: CatalogWatcher | None = None
 
 
-def _safe_get_preferences(user_id: str) -> dict:
+async def _safe_load_session(user_id: str) -> ConversationSession:
     try:
-        return conversation_store.get_preferences(user_id)
+        return await conversation_store.load_session(user_id)
     except RedisError as exc:
-        LOGGER.warning("Redis unavailable when getting preferences: %s", exc)
-        return {}
+        LOGGER.warning("Redis unavailable when loading session: %s", exc)
+        return ConversationSession(user_id)
 
 
-def _safe_store_preferences(user_id: str, preferences: dict) -> None:
+async def _safe_flush_session(session: ConversationSession) -> None:
     try:
-        conversation_store.store_preferences(user_id, preferences)
+        await conversation_store.flush_session(session)
     except RedisError as exc:
-        LOGGER.warning("Redis unavailable when storing preferences: %s", exc)
-
+        LOGGER.warning("Redis unavailable when flushing session: %s", exc)
+    except Exception:
+        # The reply is already computed; losing this turn's state beats failing the turn.
+        LOGGER.exception(json.dumps({"event": "session.flush_error", "user": session.user_id}))
 
-def _safe_save_turn(user_id: str, payload: dict) -> None:
-    try:
-        conversation_store.save_turn(user_id, payload)
-    except RedisError as exc:
-        LOGGER.warning("Redis unavailable when saving turn: %s", exc)
 
-
-def _safe_get_question(user_id: str) -> dict | None:
-    try:
-        return conversation_store.get_question(user_id)
-    except RedisError as exc:
-        LOGGER.warning("Redis unavailable when getting question: %s", exc)
-        return None
-
-
-def _safe_set_question(user_id: str, slot: str, options: list[str]) -> None:
-    try:
-        conversation_store.set_question(user_id, slot, options)
-    except RedisError as exc:
-        LOGGER.warning("Redis unavailable when setting question: %s", exc)
+def _log_catalog_load(event: str, path: str, report: CatalogLoadReport) -> None:
+    LOGGER.info(
+        json.dumps(
+            {
+                "event": event,
+                "path": path,
+                "source": report.source,
+                "cache": "hit" if report.source == "snapshot" else "rebuild",
+                "rows": report.rows,
+                "version": report.version,
+                "added": len(report.added),
+                "removed": len(report.removed),
+                "changed": len(report.changed),
+                "elapsed_ms": report.elapsed_ms,
+            }
+        )
+    )
 
 
-def _safe_clear_question(user_id: str) -> None:
-    try:
-        conversation_store.clear_question(user_id)
-    except RedisError as exc:
-        LOGGER.warning("Redis unavailable when clearing question: %s", exc)
+def _log_inventory_deltas(report: InventoryDeltaReport) -> None:
+    LOGGER.info(
+        json.dumps(
+            {
+                "event": "catalog.deltas",
+                "version": report.version,
+                "rows": report.rows,
+                "upserted": report.upserted,
+                "updated": report.updated,
+                "deleted": report.deleted,
+                "missing": len(report.missing),
+                "elapsed_ms": report.elapsed_ms,
+            }
+        )
+    )
 
 
-def _safe_get_expected_slot(user_id: str) -> str | None:
-    try:
-        return conversation_store.get_expected_slot(user_id)
-    except RedisError as exc:
-        LOGGER.warning("Redis unavailable when getting expected slot: %s", exc)
-        return None
+def _require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    if settings.admin_token and x_admin_token != settings.admin_token:
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
 
 
-def _safe_set_expected_slot(user_id: str, slot: str | None) -> None:
-    try:
-        conversation_store.set_expected_slot(user_id, slot)
-    except RedisError as exc:
-        LOGGER.warning("Redis unavailable when setting expected slot: %s", exc)
+@app.on_event("startup")
+async def configure_sync_workers() -> None:
+    # Bound the pool behind asyncio.to_thread so CPU-side work cannot pile up threads.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.sync_worker_threads, thread_name_prefix="sync-worker")
+    )
 
 
 @app.on_event("startup")
 async def load_catalog() -> None:
+    global catalog_watcher
+
     if not settings.csv_catalog_path:
         LOGGER.warning("CSV_CATALOG_PATH not configured; catalog endpoints will return empty datasets.")
         return
 
     catalog_path = Path(settings.csv_catalog_path)
     try:
-        catalog_service.load_catalog(str(catalog_path))
-        LOGGER.info("Catalog loaded from %s", catalog_path)
+        report = catalog_service.load_catalog(str(catalog_path))
+        _log_catalog_load("catalog.load", str(catalog_path), report)
     except FileNotFoundError as exc:
         LOGGER.error("Catalog file missing: %s", exc)
 
+    if settings.catalog_watch_interval_seconds > 0:
+        catalog_watcher = CatalogWatcher(
+            catalog_service,
+            str(catalog_path),
+            settings.catalog_watch_interval_seconds,
+            on_reload=lambda report: _log_catalog_load("catalog.reload", str(catalog_path), report),
+            spool_dir=settings.catalog_spool_dir,
+            on_deltas=_log_inventory_deltas,
+        )
+        catalog_watcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_catalog_watcher() -> None:
+    if catalog_watcher:
+        catalog_watcher.stop()
+
+
+@app.on_event("shutdown")
+async def close_conversation_store() -> None:
+    await conversation_store.close()
+
+
+@app.get("/admin/catalog", response_model=CatalogStatus, dependencies=[Depends(_require_admin)])
+async def catalog_status() -> CatalogStatus:
+    """Report the catalog version currently being served."""
+    return CatalogStatus(version=catalog_service.version, rows=len(catalog_service))
+
+
+@app.post("/admin/catalog/reload", response_model=CatalogReloadResponse, dependencies=[Depends(_require_admin)])
+async def reload_catalog() -> CatalogReloadResponse:
+    """Re-parse the configured CSV off the event loop and swap it in atomically."""
+    if not settings.csv_catalog_path:
+        raise HTTPException(status_code=409, detail="CSV_CATALOG_PATH not configured.")
+    try:
+        report = await asyncio.to_thread(catalog_service.load_catalog, settings.csv_catalog_path)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    _log_catalog_load("catalog.reload", settings.csv_catalog_path, report)
+    return CatalogReloadResponse(
+        version=report.version,
+        rows=report.rows,
+        source=report.source,
+        elapsed_ms=report.elapsed_ms,
+        added=report.added,
+        removed=report.removed,
+        changed=report.changed,
+    )
+
+
+@app.post(
+    "/admin/catalog/deltas",
+    response_model=InventoryDeltaResponse,
+    dependencies=[Depends(_require_admin)],
+)
+async def apply_inventory_deltas(request: Request) -> InventoryDeltaResponse:
+    """Apply an NDJSON batch of upsert/update/delete deltas keyed by stock_id."""
+    try:
+        deltas = parse_ndjson_deltas(await request.body())
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    report = await asyncio.to_thread(catalog_service.apply_deltas, deltas)
+    _log_inventory_deltas(report)
+    return InventoryDeltaResponse(
+        version=report.version,
+        rows=report.rows,
+        upserted=report.upserted,
+        updated=report.updated,
+        deleted=report.deleted,
+        missing=report.missing,
+        elapsed_ms=report.elapsed_ms,
+    )
+
+
+@app.get("/admin/metrics", dependencies=[Depends(_require_admin)])
+async def metrics() -> dict[str, float]:
+    """Expose process counters, e.g. how many intents the local fast path resolved."""
+    return METRICS.snapshot()
+
 
 @app.get("/health")
 async def health_check() -> dict[str, str]:
@@ -114,24 +250,123 @@ async def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
-def _handle_chat(payload: ChatRequest) -> ChatResponse:
-    stored_preferences = _safe_get_preferences(payload.user_id)
-    if stored_preferences and not payload.preferences:
-        payload.preferences = stored_preferences
+@app.get("/catalog/facets", response_model=CatalogFacetsResponse)
+async def catalog_facets() -> CatalogFacetsResponse:
+    """Inventory counts for browsing filters; recomputed only when the catalog changes."""
+    facets = await asyncio.to_thread(catalog_service.facets)
+    return CatalogFacetsResponse(
+        version=facets.version,
+        rows=facets.total,
+        makes=[FacetCount(value=make, count=count) for make, count in facets.makes],
+        models={
+            make: [FacetCount(value=model, count=count) for model, count in facets.models.get(make.lower(), [])]
+            for make, _ in facets.makes
+        },
+        years=[FacetCount(value=year, count=count) for year, count in facets.years],
+        price_ranges=[RangeFacetCount(min=low, max=high, count=count) for low, high, count in facets.price_buckets],
+        km_ranges=[RangeFacetCount(min=low, max=high, count=count) for low, high, count in facets.km_buckets],
+    )
+
+
+async def _handle_chat(payload: ChatRequest) -> ChatResponse:
+    start_turn()
+    # Classification only needs the raw message, so it overlaps state loading and parsing.
+    # In single-call mode only the local tiers run here; the reply call settles the rest.
+    classify = intent_classifier.classify_local if settings.single_call_mode else intent_classifier.classify
+    intent_task = asyncio.create_task(classify(payload.message))
+    try:
+        session = await _safe_load_session(payload.user_id)
+        try:
+            return await _run_turn(payload, session, intent_task)
+        finally:
+            await _safe_flush_session(session)
+    finally:
+        intent_task.cancel()
+
+
+def _log_chat_request(payload: ChatRequest, intent: str, turn: TurnContext) -> None:
+    LOGGER.info(
+        json.dumps(
+            {
+                "event": "chat.request",
+                "user": payload.user_id,
+                "channel": payload.channel or "direct",
+                "intent": intent,
+                "has_preferences": bool(turn.preferences),
+                "single_call": settings.single_call_mode,
+            }
+        )
+    )
 
-    parsed_request = message_parser.enrich_request(payload)
 
-    question = _safe_get_question(payload.user_id)
+async def _slot_options(missing_fields: list[str], preferences: dict | None) -> dict | None:
+    """Options to offer for the next missing slot, if it is one we can enumerate."""
+    if not missing_fields:
+        return None
+    next_slot = missing_fields[0]
+    if next_slot == "marca":
+        return {"slot": "marca", "options": await asyncio.to_thread(option_builder.make_options)}
+    if next_slot == "modelo" and preferences and preferences.get("make"):
+        options = await asyncio.to_thread(option_builder.model_options, preferences["make"])
+        if options:
+            return {"slot": "modelo", "options": options}
+    return None
+
+
+def _update_slot_state(
+    session: ConversationSession,
+    intent: str,
+    missing_fields: list[str],
+    slot_options: dict | None,
+) -> dict | None:
+    """Record which slot the next turn should fill; returns the options actually offered."""
+    if intent == "greeting":
+        session.set_expected_slot("preferencia_inicial")
+        return None
+    if intent == "recommendation" and missing_fields:
+        session.set_expected_slot(missing_fields[0])
+        if slot_options:
+            session.set_question(slot_options["slot"], slot_options["options"])
+        return slot_options
+    session.set_expected_slot(None)
+    session.clear_question()
+    return None
+
+
+@dataclass
+class _TurnPlan:
+    """Everything a turn needs before the reply is generated."""
+
+    request: TurnContext
+    intent: Intent | None
+    missing_fields: list[str]
+    expected_slot: str | None
+    slot_options: dict | None
+    context_task: asyncio.Task[CatalogContext]
+
+
+async def _plan_turn(
+    payload: ChatRequest,
+    session: ConversationSession,
+    intent_task: asyncio.Task[Intent | None],
+) -> _TurnPlan | ChatResponse:
+    """Parse the message and settle slot state; returns a ChatResponse to short-circuit."""
+    turn = TurnContext.from_request(payload)
+    if not turn.preferences:
+        turn.preferences = session.preferences
+    await asyncio.to_thread(message_parser.enrich, turn)
+
+    picked_option = False
+    question = session.question
     if question and question.get("options"):
         slot = question["slot"]
-        parsed_prefs = parsed_request.preferences or {}
         satisfied = (
-            (slot == "marca" and parsed_prefs.get("make"))
-            or (slot == "modelo" and parsed_prefs.get("model"))
+            (slot == "marca" and turn.preferences.get("make"))
+            or (slot == "modelo" and turn.preferences.get("model"))
         )
 
         if satisfied:
-            _safe_clear_question(payload.user_id)
+            session.clear_question()
         else:
             normalized = payload.message.strip().lower()
             normalized_options = {opt.lower(): opt for opt in question["options"]}
@@ -146,85 +381,232 @@ def _handle_chat(payload: ChatRequest) -> ChatResponse:
                     financing_plan=None,
                 )
             selected = normalized_options[normalized]
-            payload.preferences = payload.preferences or {}
             if slot == "marca":
-                payload.preferences["make"] = selected
+                turn.preferences["make"] = selected
             elif slot == "modelo":
-                payload.preferences["model"] = selected
-            _safe_clear_question(payload.user_id)
-            parsed_request = message_parser.enrich_request(payload)
-
-    enriched_payload = parsed_request
-    if enriched_payload.preferences:
-        _safe_store_preferences(payload.user_id, enriched_payload.preferences)
-    _safe_save_turn(payload.user_id, enriched_payload.model_dump())
-    missing_fields = message_parser.identify_missing_fields(payload, enriched_payload)
-    expected_slot = _safe_get_expected_slot(payload.user_id)
-    intent = intent_classifier.classify(payload.message)
+                turn.preferences["model"] = selected
+            session.clear_question()
+            picked_option = True
+            # The message parse is cached, so this only re-derives slots that depend on the pick.
+            await asyncio.to_thread(message_parser.enrich, turn)
+
+    # Speculatively search the catalog for the parsed preferences while the intent resolves.
+    context_task = asyncio.create_task(agent_service.prepare_context(turn))
+    try:
+        if turn.preferences:
+            session.store_preferences(turn.preferences)
+        session.save_turn(turn.to_record())
+        missing_fields = message_parser.identify_missing_fields(turn)
+        expected_slot = session.expected_slot
+        if picked_option:
+            # Picking one of the offered makes/models is a recommendation turn; skip the LLM.
+            intent_task.cancel()
+            intent: Intent | None = "recommendation"
+            METRICS.increment("intent.picked_option")
+        else:
+            intent = await intent_task
+
+        if intent is None:
+            # Single-call mode: the reply call decides the intent, so offer options speculatively.
+            slot_options = await _slot_options(missing_fields, turn.preferences)
+        else:
+            _log_chat_request(payload, intent, turn)
+            slot_options = None
+            if intent == "recommendation":
+                slot_options = await _slot_options(missing_fields, turn.preferences)
+            slot_options = _update_slot_state(session, intent, missing_fields, slot_options)
+    except BaseException:
+        # From here on the caller owns the task; until then nobody else can cancel it.
+        context_task.cancel()
+        raise
+    return _TurnPlan(turn, intent, missing_fields, expected_slot, slot_options, context_task)
+
+
+async def _run_turn(
+    payload: ChatRequest,
+    session: ConversationSession,
+    intent_task: asyncio.Task[Intent | None],
+) -> ChatResponse:
+    plan = await _plan_turn(payload, session, intent_task)
+    if isinstance(plan, ChatResponse):
+        return plan
+
+    try:
+        if plan.intent is None:
+            response, intent = await agent_service.answer_with_intent(
+                plan.request,
+                missing_fields=plan.missing_fields,
+                expected_slot=plan.expected_slot,
+                slot_options=plan.slot_options,
+                context=await plan.context_task,
+            )
+            _log_chat_request(payload, intent, plan.request)
+            _update_slot_state(session, intent, plan.missing_fields, plan.slot_options)
+        else:
+            intent = plan.intent
+            response = await agent_service.answer(
+                plan.request,
+                missing_fields=plan.missing_fields,
+                intent=intent,
+                expected_slot=plan.expected_slot,
+                slot_options=plan.slot_options,
+                context=await plan.context_task,
+            )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    finally:
+        plan.context_task.cancel()
+    _log_chat_response(payload, intent, response)
+    return response
+
+
+async def _stream_turn(
+    payload: ChatRequest,
+    session: ConversationSession,
+    plan: _TurnPlan | ChatResponse,
+    context: CatalogContext | None,
+    intent_task: asyncio.Task[Intent | None],
+) -> AsyncIterator[bytes]:
+    """Serialize a streamed turn as NDJSON and persist the session once it completes."""
+    try:
+        if isinstance(plan, ChatResponse):
+            yield _ndjson({"type": "context", "intent": None, **plan.model_dump(mode="json", exclude={"message"})})
+            yield _ndjson({"type": "done", "message": plan.message})
+            return
+        response = ChatResponse(message="")
+        async for event in agent_service.answer_stream(
+            plan.request,
+            context,
+            missing_fields=plan.missing_fields,
+            intent=plan.intent,
+            expected_slot=plan.expected_slot,
+            slot_options=plan.slot_options,
+        ):
+            if event["type"] == "context":
+                response = ChatResponse.model_validate({**event, "message": ""})
+            elif event["type"] == "done":
+                response.message = event["message"]
+            yield _ndjson(event)
+        _log_chat_response(payload, plan.intent or "unknown", response)
+    finally:
+        intent_task.cancel()
+        await _safe_flush_session(session)
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _log_chat_response(payload: ChatRequest, intent: str, response: ChatResponse) -> None:
     LOGGER.info(
         json.dumps(
             {
-                "event": "chat.request",
+                "event": "chat.response",
                 "user": payload.user_id,
                 "channel": payload.channel or "direct",
                 "intent": intent,
-                "has_preferences": bool(enriched_payload.preferences),
+                "recommendations": len(response.recommendations),
+                "has_financing": bool(response.financing_plan),
+                **(TURN_STATS.get() or {}),
             }
         )
     )
 
-    slot_options = None
-    if intent == "greeting":
-        _safe_set_expected_slot(payload.user_id, "preferencia_inicial")
-    elif intent == "recommendation" and missing_fields:
-        _safe_set_expected_slot(payload.user_id, missing_fields[0])
-        next_slot = missing_fields[0]
-        if next_slot == "marca":
-            options = option_builder.make_options()
-            _safe_set_question(payload.user_id, "marca", options)
-            slot_options = {"slot": "marca", "options": options}
-        elif next_slot == "modelo" and enriched_payload.preferences and enriched_payload.preferences.get("make"):
-            options = option_builder.model_options(enriched_payload.preferences["make"])
-            if options:
-                _safe_set_question(payload.user_id, "modelo", options)
-                slot_options = {"slot": "modelo", "options": options}
-    else:
-        _safe_set_expected_slot(payload.user_id, None)
-        _safe_clear_question(payload.user_id)
-
-    try:
-        response = agent_service.answer(
-            enriched_payload,
-            missing_fields=missing_fields,
-            intent=intent,
-            expected_slot=expected_slot,
-            slot_options=slot_options,
-        )
-        LOGGER.info(
-            json.dumps(
-                {
-                    "event": "chat.response",
-                    "user": payload.user_id,
-                    "channel": payload.channel or "direct",
-                    "intent": intent,
-                    "recommendations": len(response.recommendations),
-                    "has_financing": bool(response.financing_plan),
-                }
-            )
-        )
-        return response
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(payload: ChatRequest) -> ChatResponse:
     """Route inbound chat messages through the commercial agent."""
-    return _handle_chat(payload)
+    CURRENT_ENDPOINT.set("chat")
+    return await _handle_chat(payload)
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(payload: ChatRequest) -> StreamingResponse:
+    """Stream a turn as NDJSON: recommendations and financing first, then reply tokens.
+
+    Intents are always classified up front here because single-call JSON replies
+    cannot be streamed token by token.
+    """
+    CURRENT_ENDPOINT.set("chat_stream")
+    start_turn()
+    intent_task = asyncio.create_task(intent_classifier.classify(payload.message))
+    session: ConversationSession | None = None
+    plan: _TurnPlan | ChatResponse | None = None
+    try:
+        session = await _safe_load_session(payload.user_id)
+        plan = await _plan_turn(payload, session, intent_task)
+        context = None if isinstance(plan, ChatResponse) else await plan.context_task
+    except BaseException as exc:
+        intent_task.cancel()
+        if isinstance(plan, _TurnPlan):
+            plan.context_task.cancel()
+        if session is not None:
+            await _safe_flush_session(session)
+        if isinstance(exc, ValueError):
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        raise
+    return StreamingResponse(
+        _stream_turn(payload, session, plan, context, intent_task),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(payloads: list[ChatRequest]) -> StreamingResponse:
+    """Run many turns with bounded concurrency, streaming one NDJSON result per turn.
+
+    Results arrive in completion order and carry the request's `index`; turns for
+    the same `user_id` still run one after another, in request order.
+    """
+    return StreamingResponse(_run_batch(payloads, settings.batch_concurrency), media_type="application/x-ndjson")
+
+
+async def _run_batch(payloads: list[ChatRequest], concurrency: int) -> AsyncIterator[bytes]:
+    """Hand whole per-user queues to `concurrency` workers and yield results as they land."""
+    turns_by_user: dict[str, list[int]] = {}
+    for index, payload in enumerate(payloads):
+        turns_by_user.setdefault(payload.user_id, []).append(index)
+    pending = deque(turns_by_user.values())
+    worker_count = max(1, min(concurrency, len(pending)))
+    # Bounded so a slow reader pauses the workers instead of buffering every result.
+    results: asyncio.Queue[dict | None] = asyncio.Queue(maxsize=worker_count)
+
+    async def worker() -> None:
+        CURRENT_ENDPOINT.set("chat_batch")
+        while pending:
+            for index in pending.popleft():
+                await results.put(await _batch_turn(index, payloads[index]))
+        await results.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(worker_count)]
+    try:
+        running = worker_count
+        while running:
+            result = await results.get()
+            if result is None:
+                running -= 1
+                continue
+            yield _ndjson(result)
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def _batch_turn(index: int, payload: ChatRequest) -> dict:
+    try:
+        response = await _handle_chat(payload)
+    except HTTPException as exc:
+        return {"index": index, "user_id": payload.user_id, "status": exc.status_code, "detail": exc.detail}
+    except Exception:
+        LOGGER.exception(json.dumps({"event": "chat.batch_error", "user": payload.user_id, "index": index}))
+        return {"index": index, "user_id": payload.user_id, "status": 500, "detail": "Internal error."}
+    return {"index": index, "user_id": payload.user_id, "status": 200, "response": response.model_dump(mode="json")}
+
 
 @app.post("/webhook/whatsapp")
 async def whatsapp_webhook(request: Request) -> PlainTextResponse:
     form = await request.form()
     chat_request = parse_twilio_payload(dict(form))
-    response = _handle_chat(chat_request)
+    CURRENT_ENDPOINT.set("whatsapp")
+    response = await _handle_chat(chat_request)
     return PlainTextResponse(content=format_twilio_response(response))
@@ -1,53 +1,199 @@
 """Business logic for interacting with the LLM-powered commercial agent."""
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import logging
-from pathlib import Path
-from typing import Any
+import math
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from app.config import Settings
-from app.domain.models import FinancingPlan, Recommendation
-from app.domain.schemas import ChatRequest, ChatResponse
+from app.domain.models import FinancingPlan, PaymentOption, Recommendation
+from app.domain.schemas import ChatResponse
+from app.domain.turn import TurnContext
+from app.services.cache import TieredCache
 from app.services.catalog_service import CatalogService
-from app.services.finance_service import calculate_financing
+from app.services.finance_service import TERM_YEARS, calculate_financing, calculate_financing_batch
+from app.services.intent_classifier import ALLOWED_INTENTS, INTENT_CATEGORIES
+from app.services.knowledge_base import KnowledgeBase, KnowledgeSection, estimate_tokens
+from app.services.metrics import record_turn, record_usage
 
 LOGGER = logging.getLogger(__name__)
 DEFAULT_VALUE_PROPOSITION = (
     "Kavak ofrece autos seminuevos inspeccionados con garantías, financiamiento flexible "
     "y acompañamiento comercial end-to-end para clientes en Latinoamérica."
 )
+CONVERSATIONAL_INTENTS = {"greeting", "small_talk", "ambiguous", "off_topic"}
+NOT_CONFIGURED_MESSAGE = "LLM client not configured. Please provide an OPENAI_API_KEY."
+UNAVAILABLE_MESSAGE = "I'm unable to reach the language model right now, but here is a curated response."
+AGENT_SYSTEM_PROMPT = (
+    "Eres un agente comercial de Kavak. Solo puedes responder utilizando la información "
+    "incluida en el contexto proporcionado. Si el cliente pregunta sobre la propuesta de valor, "
+    "debes citar únicamente lo que aparece en el archivo oficial. No inventes datos ni hagas "
+    "suposiciones. Mantén un tono proactivo: ofrece siempre una recomendación o un próximo paso "
+    "antes de solicitar más datos. Evita frases negativas como 'no tengo información'; en su lugar "
+    "propón alternativas y formula preguntas cortas solo al final. No repitas las listas de recomendaciones, "
+    "pues el canal las enviará por separado.\n\n"
+    "Instrucciones: responde en español, cita solamente datos que estén en el contexto y, si no "
+    "existe la información solicitada, aclara que no está disponible. Si falta información clave, "
+    "formula una pregunta concreta para poder ayudar mejor."
+)
+CLASSIFY_INSTRUCTIONS = (
+    f" Clasifica la intención del mensaje en una de las categorías: {INTENT_CATEGORIES}. "
+    "Si la intención es greeting, small_talk, off_topic o ambiguous, no menciones los vehículos "
+    "recomendados ni las opciones disponibles."
+)
+SINGLE_CALL_INSTRUCTIONS = (
+    " Responde únicamente con un objeto JSON de la forma "
+    '{"intent": "<etiqueta>", "reply": "<respuesta para el cliente>"}.'
+)
+
+
+@dataclass(frozen=True)
+class CatalogContext:
+    """Catalog and financing facts for a turn, computable before the intent is known."""
+
+    recommendations: list[Recommendation]
+    used_fallback: bool
+    financing_plan: FinancingPlan | None
 
 
 class LLMClient:
-    """Thin wrapper around OpenAI's Chat Completions API."""
+    """Thin wrapper around OpenAI's Chat Completions API with an optional reply cache."""
 
-    def __init__(self, api_key: str | None, model: str) -> None:
+    def __init__(
+        self,
+        api_key: str | None,
+        model: str,
+        timeout: float | None = None,
+        temperature: float = 0.2,
+        cache: TieredCache | None = None,
+    ) -> None:
         self.model = model
-        self._client: OpenAI | None = None
+        self.temperature = temperature
+        self.cache = cache
+        self._client: AsyncOpenAI | None = None
         if api_key:
-            self._client = OpenAI(api_key=api_key)
+            self._client = AsyncOpenAI(api_key=api_key, timeout=timeout)
+
+    @property
+    def configured(self) -> bool:
+        return self._client is not None
+
+    async def generate(self, system_prompt: str, user_prompt: str, cache_scope: str = "") -> str:
+        """Return the model's reply, reusing a cached one for an identical request.
+
+        `cache_scope` partitions the cache by anything the prompts depend on
+        implicitly, such as the catalog version, so stale inventory never leaks.
+        """
+        if not self._client:
+            return NOT_CONFIGURED_MESSAGE
+
+        try:
+            message = await self._complete(system_prompt, user_prompt, cache_scope)
+        except Exception as exc:  # pragma: no cover - network call
+            LOGGER.warning("LLM call failed: %s", exc)
+            return UNAVAILABLE_MESSAGE
+        return message or "No response generated by the language model."
 
-    def generate(self, system_prompt: str, user_prompt: str) -> str:
+    async def stream(self, system_prompt: str, user_prompt: str, cache_scope: str = "") -> AsyncIterator[str]:
+        """Yield the reply as OpenAI streams it; a cached reply arrives as one chunk."""
         if not self._client:
-            return "LLM client not configured. Please provide an OPENAI_API_KEY."
+            yield NOT_CONFIGURED_MESSAGE
+            return
 
+        key = self._cache_key(system_prompt, user_prompt, cache_scope, False) if self.cache else ""
+        if self.cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts: list[str] = []
         try:
-            response = self._client.chat.completions.create(
+            chunks = await self._client.chat.completions.create(
                 model=self.model,
-                temperature=0.2,
+                temperature=self.temperature,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
                 ],
+                stream=True,
+                stream_options={"include_usage": True},
             )
+            async for chunk in chunks:
+                # With include_usage the final chunk carries no choices, only token counts.
+                record_usage("llm", getattr(chunk, "usage", None))
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    parts.append(text)
+                    yield text
+        except Exception as exc:  # pragma: no cover - network call
+            LOGGER.warning("LLM stream failed: %s", exc)
+            if not parts:
+                yield UNAVAILABLE_MESSAGE
+            return
+        if not parts:
+            yield "No response generated by the language model."
+        elif self.cache:
+            await self.cache.set(key, "".join(parts))
+
+    async def generate_json(self, system_prompt: str, user_prompt: str, cache_scope: str = "") -> dict | None:
+        """Like `generate`, but in JSON mode; returns None when no usable object comes back."""
+        if not self._client:
+            return None
+
+        try:
+            message = await self._complete(system_prompt, user_prompt, cache_scope, json_mode=True)
+            parsed = json.loads(message or "")
+        except json.JSONDecodeError as exc:
+            LOGGER.warning("LLM returned invalid JSON: %s", exc)
+            return None
         except Exception as exc:  # pragma: no cover - network call
             LOGGER.warning("LLM call failed: %s", exc)
-            return "I'm unable to reach the language model right now, but here is a curated response."
+            return None
+        return parsed if isinstance(parsed, dict) else None
 
+    async def _complete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        cache_scope: str,
+        json_mode: bool = False,
+    ) -> str | None:
+        key = self._cache_key(system_prompt, user_prompt, cache_scope, json_mode) if self.cache else ""
+        if self.cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        options: dict[str, Any] = {"response_format": {"type": "json_object"}} if json_mode else {}
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            temperature=self.temperature,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            **options,
+        )
+        record_usage("llm", getattr(response, "usage", None))
         message = response.choices[0].message.content
-        return message or "No response generated by the language model."
+        if message and self.cache:
+            await self.cache.set(key, message)
+        return message
+
+    def _cache_key(self, system_prompt: str, user_prompt: str, cache_scope: str, json_mode: bool) -> str:
+        canonical = json.dumps(
+            [self.model, self.temperature, json_mode, cache_scope, system_prompt, user_prompt],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
 
 class CommercialAgentService:
@@ -58,75 +204,182 @@ class CommercialAgentService:
         catalog_service: CatalogService,
         settings: Settings,
         knowledge_base_path: str | None = None,
+        reply_cache: TieredCache | None = None,
     ) -> None:
         self.catalog_service = catalog_service
         self.settings = settings
-        self.llm_client = LLMClient(settings.openai_api_key, settings.openai_model)
-        self.knowledge_base = self._load_knowledge_base(knowledge_base_path) or DEFAULT_VALUE_PROPOSITION
+        self.llm_client = LLMClient(
+            settings.openai_api_key,
+            settings.openai_model,
+            settings.openai_timeout_seconds,
+            cache=reply_cache,
+        )
+        self.knowledge_base = KnowledgeBase.from_path(knowledge_base_path, DEFAULT_VALUE_PROPOSITION)
 
-    def answer(
+    async def answer(
         self,
-        request: ChatRequest,
+        request: TurnContext,
         missing_fields: list[str] | None = None,
         intent: str | None = None,
         expected_slot: str | None = None,
         slot_options: dict | None = None,
+        context: CatalogContext | None = None,
     ) -> ChatResponse:
-        """Route a chat request through catalog, finance and LLM components."""
-        recommendations, used_fallback = self._build_recommendations(request.preferences, intent=intent)
-        financing_plan = self._build_financing_plan(request)
+        """Route a chat request through catalog, finance and LLM components.
+
+        `context` may come from an earlier `prepare_context` call that ran while
+        the intent was still being classified.
+        """
+        if context is None:
+            context = await self.prepare_context(request)
+        response, system_prompt, user_prompt = self._prepare_reply(
+            request, context, missing_fields, intent, expected_slot, slot_options
+        )
+        response.message = await self.llm_client.generate(system_prompt, user_prompt, cache_scope=self._cache_scope())
+        return response
 
-        assistant_message = self._generate_agent_reply(
+    async def answer_stream(
+        self,
+        request: TurnContext,
+        context: CatalogContext,
+        missing_fields: list[str] | None = None,
+        intent: str | None = None,
+        expected_slot: str | None = None,
+        slot_options: dict | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Stream a turn as events: structured results first, then reply tokens.
+
+        Yields a `context` event with recommendations and financing (already
+        computed, so it goes out before the LLM is even called), one `token`
+        event per streamed chunk and a final `done` event with the full reply.
+        """
+        response, system_prompt, user_prompt = self._prepare_reply(
+            request, context, missing_fields, intent, expected_slot, slot_options
+        )
+        yield {"type": "context", "intent": intent, **response.model_dump(mode="json", exclude={"message"})}
+        parts: list[str] = []
+        async for text in self.llm_client.stream(system_prompt, user_prompt, cache_scope=self._cache_scope()):
+            parts.append(text)
+            yield {"type": "token", "text": text}
+        yield {"type": "done", "message": "".join(parts)}
+
+    def _prepare_reply(
+        self,
+        request: TurnContext,
+        context: CatalogContext,
+        missing_fields: list[str] | None,
+        intent: str | None,
+        expected_slot: str | None,
+        slot_options: dict | None,
+    ) -> tuple[ChatResponse, str, str]:
+        """Pick the structured results for the intent and build the reply prompts."""
+        recommendations, used_fallback = context.recommendations, context.used_fallback
+        if intent in CONVERSATIONAL_INTENTS:
+            recommendations, used_fallback = [], False
+        system_prompt, user_prompt = self._build_prompts(
             user_message=request.message,
             recommendations=recommendations,
-            financing_plan=financing_plan,
+            financing_plan=context.financing_plan,
             missing_fields=missing_fields or [],
             used_fallback=used_fallback,
             intent=intent or "unknown",
             expected_slot=expected_slot,
             slot_options=slot_options,
         )
+        response = ChatResponse(message="", recommendations=recommendations, financing_plan=context.financing_plan)
+        return response, system_prompt, user_prompt
 
-        return ChatResponse(
-            message=assistant_message,
+    async def answer_with_intent(
+        self,
+        request: TurnContext,
+        missing_fields: list[str] | None = None,
+        expected_slot: str | None = None,
+        slot_options: dict | None = None,
+        context: CatalogContext | None = None,
+    ) -> tuple[ChatResponse, str]:
+        """Classify the message and write the reply in a single structured-output call.
+
+        The prompt carries the speculative recommendations and slot options; the
+        model is told to ignore them for conversational intents, and they are
+        dropped from the response accordingly.
+        """
+        if context is None:
+            context = await self.prepare_context(request)
+        system_prompt, user_prompt = self._build_prompts(
+            user_message=request.message,
+            recommendations=context.recommendations,
+            financing_plan=context.financing_plan,
+            missing_fields=missing_fields or [],
+            used_fallback=context.used_fallback,
+            intent=None,
+            expected_slot=expected_slot,
+            slot_options=slot_options,
+        )
+        payload = await self.llm_client.generate_json(
+            system_prompt + SINGLE_CALL_INSTRUCTIONS, user_prompt, cache_scope=self._cache_scope()
+        ) or {}
+        intent = str(payload.get("intent", "")).strip().lower()
+        if intent not in ALLOWED_INTENTS:
+            intent = "ambiguous"
+        message = payload.get("reply")
+        if not isinstance(message, str) or not message.strip():
+            message = UNAVAILABLE_MESSAGE if self.llm_client.configured else NOT_CONFIGURED_MESSAGE
+
+        recommendations = [] if intent in CONVERSATIONAL_INTENTS else context.recommendations
+        response = ChatResponse(
+            message=message,
             recommendations=recommendations,
-            financing_plan=financing_plan,
+            financing_plan=context.financing_plan,
         )
+        return response, intent
+
+    async def prepare_context(self, request: TurnContext) -> CatalogContext:
+        """Search the catalog and price financing for the request's known preferences."""
+        # Catalog ranking and financing math are synchronous; keep them off the event loop.
+        return await asyncio.to_thread(self._build_context, request)
+
+    def _build_context(self, request: TurnContext) -> CatalogContext:
+        if request.financing:
+            down_payment = request.financing.down_payment
+        else:
+            down_payment = float(request.preferences.get("down_payment") or 0)
+        recommendations, used_fallback = self._build_recommendations(request.preferences, down_payment)
+        return CatalogContext(recommendations, used_fallback, self._build_financing_plan(request))
 
     def _build_recommendations(
         self,
         preferences: dict[str, Any] | None,
-        intent: str | None,
+        down_payment: float = 0.0,
     ) -> tuple[list[Recommendation], bool]:
-        if intent in {"greeting", "small_talk", "ambiguous", "off_topic"}:
+        # The budget filter and the quotes must assume the same down payment.
+        prefs = {**(preferences or {}), "down_payment": down_payment}
+        cars = self.catalog_service.rank_cars(prefs, limit=3)
+        reason = "Coincide con tus preferencias"
+        used_fallback = False
+        if not cars:
+            cars = self.catalog_service.suggest_alternatives(prefs)
+            reason = "Alternativa disponible similar a lo que buscas"
+            used_fallback = bool(cars)
+        if not cars:
             return ([], False)
-        prefs = preferences or {}
-        cars = self.catalog_service.search_cars(prefs)
-        if cars:
-            return ([Recommendation(car=car, reason="Coincide con tus preferencias") for car in cars[:3]], False)
-
-        alternatives = self.catalog_service.suggest_alternatives(prefs)
-        if alternatives:
-            return (
-                [
-                    Recommendation(car=car, reason="Alternativa disponible similar a lo que buscas")
-                    for car in alternatives
+
+        # Every allowed term for every car in one vectorized call.
+        payments = calculate_financing_batch([car.price for car in cars], down_payment)[:, :, 0]
+        recommendations = [
+            Recommendation(
+                car=car,
+                reason=reason,
+                payment_options=[
+                    PaymentOption(months=years * 12, monthly_payment=float(payment))
+                    for years, payment in zip(TERM_YEARS, row)
+                    if not math.isnan(payment)
                 ],
-                True,
             )
-        return ([], False)
+            for car, row in zip(cars, payments)
+        ]
+        return (recommendations, used_fallback)
 
-    @staticmethod
-    def _load_knowledge_base(path: str | None) -> str | None:
-        if not path:
-            return None
-        file_path = Path(path)
-        if not file_path.exists():
-            LOGGER.warning("Value proposition file not found at %s", path)
-            return None
-        return file_path.read_text(encoding="utf-8")
-
-    def _build_financing_plan(self, request: ChatRequest) -> FinancingPlan | None:
+    def _build_financing_plan(self, request: TurnContext) -> FinancingPlan | None:
         if not request.financing:
             return None
 
@@ -137,28 +390,42 @@ class CommercialAgentService:
             years=financing.years,
         )
 
-    def _generate_agent_reply(
+    def _select_knowledge(self, user_message: str, intent: str | None) -> list[KnowledgeSection]:
+        """Value-proposition sections worth sending for this intent, within the token budget.
+
+        `intent=None` (single-call mode) only gets sections that actually match.
+        """
+        budget = self.settings.knowledge_base_token_budget
+        if intent is None:
+            return self.knowledge_base.select(user_message, budget)
+        if intent in self.settings.knowledge_base_intents:
+            return self.knowledge_base.select(user_message, budget, fallback=True)
+        return []
+
+    def _cache_scope(self) -> str:
+        return f"catalog-v{self.catalog_service.version}"
+
+    def _build_prompts(
         self,
         user_message: str,
         recommendations: list[Recommendation],
         financing_plan: FinancingPlan | None,
         missing_fields: list[str],
         used_fallback: bool,
-        intent: str,
+        intent: str | None,
         expected_slot: str | None,
         slot_options: dict | None = None,
-    ) -> str:
-        system_prompt = (
-            "Eres un agente comercial de Kavak. Solo puedes responder utilizando la información "
-            "incluida en el contexto proporcionado. Si el cliente pregunta sobre la propuesta de valor, "
-            "debes citar únicamente lo que aparece en el archivo oficial. No inventes datos ni hagas "
-            "suposiciones. Mantén un tono proactivo: ofrece siempre una recomendación o un próximo paso "
-            "antes de solicitar más datos. Evita frases negativas como 'no tengo información'; en su lugar "
-            "propón alternativas y formula preguntas cortas solo al final. No repitas las listas de recomendaciones, "
-            "pues el canal las enviará por separado."
-        )
+    ) -> tuple[str, str]:
+        """Return the system and user prompts; `intent=None` asks the model to classify it."""
+        # Stable rules first, per-turn data and the message last (see docs/prompt_strategy.md).
+        system_prompt = AGENT_SYSTEM_PROMPT
+        if intent is None:
+            system_prompt += CLASSIFY_INSTRUCTIONS
 
-        context_sections = [self.knowledge_base]
+        context_sections = []
+        knowledge = self._select_knowledge(user_message, intent)
+        if knowledge:
+            context_sections.append("\n\n".join(section.text for section in knowledge))
         if recommendations:
             rec_lines = [
                 f"- {rec.car.make} {rec.car.model} {rec.car.year} at MXN {rec.car.price:,.0f}"
@@ -182,7 +449,8 @@ class CommercialAgentService:
                 "Datos faltantes detectados: " + ", ".join(missing_fields) + ". Pide esta información amablemente."
             )
 
-        context_sections.append(f"Intento detectado: {intent}.")
+        if intent is not None:
+            context_sections.append(f"Intento detectado: {intent}.")
         if expected_slot:
             context_sections.append(
                 f"Dato prioritario pendiente: {expected_slot}. Formula una única pregunta directa sobre ese dato si aplica."
@@ -193,11 +461,7 @@ class CommercialAgentService:
                 f"Opciones disponibles para {slot_options['slot']}:\n{options_text}. Indica al cliente que elija solo una de ellas."
             )
         context = "\n\n".join(context_sections)
-        user_prompt = (
-            "Mensaje del cliente: "
-            f"{user_message}\n\nContexto autorizado:\n{context}\n\n"
-            "Instrucciones: responde en español, cita solamente datos que estén en el contexto y, si no "
-            "existe la información solicitada, aclara que no está disponible. Si falta información clave, "
-            "formula una pregunta concreta para poder ayudar mejor."
-        )
-        return self.llm_client.generate(system_prompt, user_prompt)
+        record_turn("prompt.knowledge_tokens", sum(section.tokens for section in knowledge))
+        record_turn("prompt.context_tokens", estimate_tokens(context))
+        user_prompt = f"Contexto autorizado:\n{context}\n\nMensaje del cliente: {user_message}"
+        return system_prompt, user_prompt
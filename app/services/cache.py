@@ -0,0 +1,113 @@
+"""Two-tier memoization: an in-process LRU with TTL and an optional shared Redis tier."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.services.metrics import CURRENT_ENDPOINT, METRICS
+
+LOGGER = logging.getLogger(__name__)
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU whose entries also expire after `ttl_seconds`."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class TieredCache:
+    """String cache checked locally first, then in Redis when a client is given.
+
+    `namespace` should change whenever cached values would (e.g. model or prompt),
+    which retires old entries in both tiers without an explicit flush. Redis
+    failures are logged and treated as misses.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        namespace: str,
+        max_entries: int,
+        ttl_seconds: int,
+        redis_client: aioredis.Redis | None = None,
+    ) -> None:
+        self.name = name
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.local = TTLCache(max_entries, ttl_seconds)
+        self.redis_client = redis_client
+
+    async def get(self, key: str) -> str | None:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count("hit_local")
+            return value
+        if self.redis_client is not None:
+            try:
+                value = await self.redis_client.get(self._redis_key(key))
+            except RedisError as exc:
+                LOGGER.warning("Redis unavailable when reading %s cache: %s", self.name, exc)
+                value = None
+            if value is not None:
+                self._count("hit_shared")
+                self.local.set(key, value)
+                return value
+        self._count("miss")
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self.local.set(key, value)
+        if self.redis_client is None:
+            return
+        try:
+            await self.redis_client.set(self._redis_key(key), value, ex=self.ttl_seconds)
+        except RedisError as exc:
+            LOGGER.warning("Redis unavailable when writing %s cache: %s", self.name, exc)
+
+    def _count(self, outcome: str) -> None:
+        METRICS.increment(f"cache.{self.name}.{outcome}")
+        endpoint = CURRENT_ENDPOINT.get()
+        if endpoint:
+            METRICS.increment(f"cache.{self.name}.{endpoint}.{outcome}")
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.name}:{self.namespace}:{key}"
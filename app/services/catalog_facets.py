@@ -0,0 +1,68 @@
+"""Inventory aggregates behind slot options and the public facets endpoint."""
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Mapping
+
+PRICE_BUCKET_MXN = 50_000
+KM_BUCKET = 20_000
+
+
+@dataclass(frozen=True)
+class CatalogFacets:
+    """Live-unit counts per make, make+model, year and price/km bucket at one catalog version.
+
+    Makes and models are pre-sorted by inventory (most units first, ties by name),
+    so building an option list is a dict lookup plus a slice.
+    """
+
+    version: int
+    total: int
+    makes: list[tuple[str, int]]
+    models: dict[str, list[tuple[str, int]]]
+    years: list[tuple[int, int]]
+    price_buckets: list[tuple[int, int, int]]
+    km_buckets: list[tuple[int, int, int]]
+
+    @classmethod
+    def from_counts(
+        cls,
+        version: int,
+        make_counts: Mapping[str, int],
+        pair_counts: Mapping[tuple[str, str], int],
+        year_counts: Mapping[int, int],
+        price_bucket_counts: Mapping[int, int],
+        km_bucket_counts: Mapping[int, int],
+    ) -> CatalogFacets:
+        """Build from raw counters; `models` is keyed by lowercased make."""
+        by_make: dict[str, Counter[str]] = {}
+        for (make, model), count in pair_counts.items():
+            if count > 0:
+                by_make.setdefault(make.lower(), Counter())[model] += count
+        return cls(
+            version=version,
+            total=sum(count for count in make_counts.values() if count > 0),
+            makes=_ranked(make_counts),
+            models={make: _ranked(counts) for make, counts in by_make.items()},
+            years=sorted((year, count) for year, count in year_counts.items() if count > 0),
+            price_buckets=_buckets(price_bucket_counts, PRICE_BUCKET_MXN),
+            km_buckets=_buckets(km_bucket_counts, KM_BUCKET),
+        )
+
+    def top_makes(self, limit: int | None = None) -> list[str]:
+        makes = self.makes[:limit] if limit else self.makes
+        return [make for make, _ in makes]
+
+    def top_models(self, make: str, limit: int | None = None) -> list[str]:
+        models = self.models.get(make.lower(), [])
+        models = models[:limit] if limit else models
+        return [model for model, _ in models]
+
+
+def _ranked(counts: Mapping[str, int]) -> list[tuple[str, int]]:
+    return sorted(((name, count) for name, count in counts.items() if count > 0), key=lambda item: (-item[1], item[0]))
+
+
+def _buckets(counts: Mapping[int, int], width: int) -> list[tuple[int, int, int]]:
+    return [(bucket * width, (bucket + 1) * width, count) for bucket, count in sorted(counts.items()) if count > 0]
@@ -0,0 +1,653 @@
+"""In-memory indexes used to answer catalog queries without full scans."""
+from __future__ import annotations
+
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from typing import Any
+
+import numpy as np
+
+from app.services.catalog_facets import KM_BUCKET, PRICE_BUCKET_MXN, CatalogFacets
+from app.services.catalog_store import CatalogStore, code_mask, mask_lookup
+from app.services.finance_service import affordable_price
+from app.services.similarity_index import SimilarityIndex
+
+MAX_RESOLVED_FILTERS = 1024
+MIN_OVERLAY_BEFORE_COMPACTION = 1024
+OVERLAY_COMPACTION_RATIO = 0.05
+_EMPTY_ROWS = np.empty(0, dtype=np.int64)
+SORTED_FIELDS = ("price", "km", "year")
+RANKING_KEYS = ("relevance", "price_proximity", "price", "km", "year")
+HEAP_CANDIDATE_LIMIT = 4096
+WALK_CHUNK = 256
+NEAREST_CHUNK = 512
+NEAREST_SCAN_RATIO = 0.05
+
+
+class CatalogIndex:
+    """Hash indexes on make/model and sorted orderings on price, km and year.
+
+    Rows are referenced by their position in the `CatalogStore`, so results can be
+    materialized lazily by the owning service.
+
+    Incremental updates never rewrite the base arrays: new or changed rows go to
+    small sorted overlays, and superseded base entries are left behind as stale
+    candidates that the query filters out by re-checking predicates against the
+    current column values. `needs_compaction` tells the owner when to rebuild.
+    """
+
+    def __init__(self, store: CatalogStore) -> None:
+        self.store = store
+        rows = store.live_rows()
+        make_codes = store.column("make")[rows]
+        model_codes = store.column("model")[rows]
+
+        self._by_make = self._group(make_codes, rows)
+        self._by_model = self._group(model_codes, rows)
+        self._sorted = {name: self._sort(store.column(name)[rows], rows) for name in SORTED_FIELDS}
+        # Newest-first ordering (ties by catalog position) for year rankings.
+        self._newest_first = self._sort(-store.column("year")[rows].astype(np.int64), rows)
+        self._resolved: dict[tuple[str, str], np.ndarray] = {}
+        # Spread of each ranking feature, used to blend them into one relevance score.
+        self._scales = tuple(
+            (float(np.std(store.column(name)[rows])) if len(rows) else 0.0) or 1.0
+            for name in SORTED_FIELDS
+        )
+
+        self.similarity = SimilarityIndex(store)
+
+        # Overlays absorbing incremental updates until the next compaction.
+        self._group_overlay: dict[str, dict[int, list[int]]] = {"make": {}, "model": {}}
+        self._sorted_overlay: dict[str, list[tuple[float, int]]] = {name: [] for name in SORTED_FIELDS}
+        self._overlay_size = 0
+
+        # Live row counts back the make/model vocabularies exposed to callers.
+        self._make_counts: Counter[int] = self._count(make_codes)
+        self._model_counts: Counter[int] = self._count(model_codes)
+        pair_keys = make_codes.astype(np.int64) * len(store.models) + model_codes
+        self._pair_counts: Counter[tuple[int, int]] = Counter(
+            {divmod(key, len(store.models)): count for key, count in self._count(pair_keys).items()}
+        )
+        # Facet counters, maintained alongside the vocabulary counts above.
+        self._year_counts: Counter[int] = self._count(store.column("year")[rows])
+        self._price_bucket_counts: Counter[int] = self._count(
+            (store.column("price")[rows] // PRICE_BUCKET_MXN).astype(np.int64)
+        )
+        self._km_bucket_counts: Counter[int] = self._count(store.column("km")[rows] // KM_BUCKET)
+
+        # First make seen for each (lowercased) model, mirroring catalog order.
+        self._make_by_model: dict[str, int] = {}
+        _, first_positions = np.unique(model_codes, return_index=True)
+        for position in np.sort(first_positions).tolist():
+            lowered = store.models.lowered[int(model_codes[position])]
+            self._make_by_model.setdefault(lowered, int(make_codes[position]))
+
+    def query(self, preferences: dict[str, Any]) -> np.ndarray:
+        """Return catalog positions matching the preference filters, in catalog order."""
+        plan = self._plan(preferences)
+        if plan.driver is None:
+            return self.store.live_rows()
+        rows = plan.driver
+        return np.unique(rows[plan.matches(rows)])
+
+    def top_k(
+        self,
+        preferences: dict[str, Any],
+        limit: int,
+        key: str = "relevance",
+        make_codes: Any = None,
+        target: float | None = None,
+    ) -> np.ndarray:
+        """Return up to `limit` matching rows ordered by a ranking key.
+
+        Keys: `price_proximity` (closest to `max_price`), `price` (cheapest), `km`
+        (lowest mileage), `year` (newest) and `relevance` (a blend of all three).
+        The price target defaults to the price ceiling (`max_price`, or the
+        bound a `max_monthly_payment` implies).
+        Sorted-key rankings walk the index orderings and stop as soon as `limit`
+        matches are certain; relevance walks the three orderings side by side and
+        stops once no unseen row can beat the current top `limit`. Nothing ever
+        copies or sorts the full inventory.
+        """
+        if key not in RANKING_KEYS:
+            msg = f"Unknown ranking key: {key}"
+            raise ValueError(msg)
+        if limit <= 0:
+            return _EMPTY_ROWS
+        plan = self._plan(preferences, make_codes=make_codes)
+        if target is None:
+            target = price_ceiling(preferences)
+        if key == "price_proximity" and not target:
+            key = "price"
+
+        if plan.driver is not None and len(plan.driver) <= HEAP_CANDIDATE_LIMIT:
+            rows = np.unique(plan.driver[plan.matches(plan.driver)])
+            return _select(rows, self._score(rows, key, target), limit)
+        if key == "relevance":
+            return self._walk_relevance(plan, target, limit)
+        if key == "price_proximity":
+            return self._walk_nearest(plan, float(target), limit)
+        return self._walk_sorted(plan, key, limit)
+
+    def nearest(
+        self,
+        target: dict[str, float],
+        limit: int,
+        make_codes: Any = None,
+        model_codes: Any = None,
+    ) -> np.ndarray:
+        """k-nearest-neighbour search that prunes by price before scoring.
+
+        Scoring expands outward from the target price along the sorted price index.
+        Every distance term is non-negative, so once the price gap at the window
+        frontier alone exceeds the k-th best distance no unseen row can win.
+        """
+        similarity = self.similarity
+        if "price" not in target or limit <= 0:
+            return similarity.nearest(target, limit, make_codes, model_codes)
+
+        price = float(target["price"])
+        keys, rows = self._sorted["price"]
+        column = self.store.columns["price"]
+        total = len(rows)
+        low = high = int(np.searchsorted(keys, price))
+        best_rows, best_distances = _EMPTY_ROWS, np.empty(0, dtype=np.float32)
+        kth_distance = math.inf
+        step = NEAREST_CHUNK
+        while low > 0 or high < total:
+            new_low, new_high = max(low - step, 0), min(high + step, total)
+            if kth_distance < math.inf:
+                # The k-th best so far bounds the price gap; jump straight to that window.
+                radius = similarity.price_radius(kth_distance)
+                new_low = min(low, int(np.searchsorted(keys, price - radius, side="left")))
+                new_high = max(high, int(np.searchsorted(keys, price + radius, side="right")))
+            if new_high - new_low > total * NEAREST_SCAN_RATIO:
+                # The bound is too loose to prune much; a straight vectorized scan wins.
+                return similarity.nearest(target, limit, make_codes, model_codes)
+            chunk_rows = np.concatenate([rows[new_low:low], rows[high:new_high]])
+            chunk_keys = np.concatenate([keys[new_low:low], keys[high:new_high]])
+            chunk_rows = chunk_rows[column[chunk_rows] == chunk_keys]
+            low, high, step = new_low, new_high, step * 2
+
+            best_rows = np.concatenate([best_rows, chunk_rows])
+            best_distances = np.concatenate(
+                [best_distances, similarity.distances(chunk_rows, target, make_codes, model_codes)]
+            )
+            if len(best_rows) > limit:
+                keep = np.argpartition(best_distances, limit - 1)[:limit]
+                best_rows, best_distances = best_rows[keep], best_distances[keep]
+            if len(best_rows) >= limit:
+                kth_distance = float(best_distances.max())
+                frontier = min(
+                    price - keys[low - 1] if low > 0 else math.inf,
+                    keys[high] - price if high < total else math.inf,
+                )
+                if frontier > similarity.price_radius(kth_distance):
+                    break
+
+        lower = upper = None
+        if math.isfinite(kth_distance):
+            radius = similarity.price_radius(kth_distance)
+            lower, upper = price - radius, price + radius
+        overlay = self._overlay_rows(_QueryPlan(self.store, None, None, None, None, None), "price", lower, upper)
+        candidates = np.unique(np.concatenate([best_rows, overlay]))
+        return similarity.nearest(target, limit, make_codes, model_codes, rows=candidates)
+
+    def _plan(self, preferences: dict[str, Any], make_codes: Any = None) -> _QueryPlan:
+        make = preferences.get("make")
+        model = preferences.get("model")
+        max_price = price_ceiling(preferences)
+        max_km = preferences.get("max_km")
+        min_year = preferences.get("min_year")
+
+        if make_codes is None and make:
+            make_codes = self.resolve("make", make)
+        plan = _QueryPlan(
+            store=self.store,
+            make_codes=np.asarray(make_codes, dtype=np.int32) if make_codes is not None else None,
+            model_codes=self.resolve("model", model) if model else None,
+            price_limit=float(max_price) if max_price is not None else None,
+            km_limit=int(max_km) if max_km is not None else None,
+            year_limit=int(min_year) if min_year is not None else None,
+        )
+
+        # Each active filter yields a candidate set; drive from the smallest one and
+        # evaluate every predicate on just those rows.
+        candidate_sets: list[np.ndarray] = []
+        if plan.make_codes is not None:
+            candidate_sets.append(self._group_rows("make", plan.make_codes))
+        if plan.model_codes is not None:
+            candidate_sets.append(self._group_rows("model", plan.model_codes))
+        if plan.price_limit is not None:
+            candidate_sets.append(self._range_rows("price", upper=plan.price_limit))
+        if plan.km_limit is not None:
+            candidate_sets.append(self._range_rows("km", upper=plan.km_limit))
+        if plan.year_limit is not None:
+            candidate_sets.append(self._range_rows("year", lower=plan.year_limit))
+        if candidate_sets:
+            plan.driver = min(candidate_sets, key=len)
+        return plan
+
+    def _score(self, rows: np.ndarray, key: str, target: Any) -> np.ndarray:
+        """Lower is better for every ranking key."""
+        columns = self.store.columns
+        if key == "price_proximity":
+            return np.abs(columns["price"][rows] - float(target))
+        if key == "price":
+            return columns["price"][rows]
+        if key == "km":
+            return columns["km"][rows].astype(np.float64)
+        if key == "year":
+            return -columns["year"][rows].astype(np.float64)
+        price_scale, km_scale, year_scale = self._scales
+        prices = columns["price"][rows]
+        price_term = np.abs(prices - float(target)) if target else prices
+        return (
+            price_term / price_scale
+            + columns["km"][rows] / km_scale
+            - columns["year"][rows] / year_scale
+        )
+
+    def _walk_sorted(self, plan: _QueryPlan, field: str, limit: int) -> np.ndarray:
+        descending = field == "year"
+        keys, rows = self._newest_first if descending else self._sorted[field]
+        sign = -1 if descending else 1
+        column = self.store.columns[field]
+        found: list[np.ndarray] = []
+        count = 0
+        for offset in range(0, len(rows), WALK_CHUNK):
+            chunk_rows = rows[offset : offset + WALK_CHUNK]
+            chunk_keys = keys[offset : offset + WALK_CHUNK]
+            # Base entries whose value changed since the last compaction are stale.
+            valid = (column[chunk_rows] * sign == chunk_keys) & plan.matches(chunk_rows)
+            found.append(chunk_rows[valid])
+            count += int(valid.sum())
+            if count >= limit:
+                break
+
+        rows_found = np.concatenate(found) if found else _EMPTY_ROWS
+        lower = upper = None
+        if len(rows_found) >= limit:
+            bound = column[rows_found[limit - 1]].item()
+            lower, upper = (bound, None) if descending else (None, bound)
+        candidates = np.unique(np.concatenate([rows_found, self._overlay_rows(plan, field, lower, upper)]))
+        return _select(candidates, self._score(candidates, field, None), limit)
+
+    def _walk_nearest(self, plan: _QueryPlan, target: float, limit: int) -> np.ndarray:
+        keys, rows = self._sorted["price"]
+        column = self.store.columns["price"]
+        total = len(rows)
+        low = high = int(np.searchsorted(keys, target))
+        found: list[np.ndarray] = []
+        kth_distance = math.inf
+        while low > 0 or high < total:
+            new_low, new_high = max(low - WALK_CHUNK, 0), min(high + WALK_CHUNK, total)
+            chunk_rows = np.concatenate([rows[new_low:low], rows[high:new_high]])
+            chunk_keys = np.concatenate([keys[new_low:low], keys[high:new_high]])
+            valid = (column[chunk_rows] == chunk_keys) & plan.matches(chunk_rows)
+            found.append(chunk_rows[valid])
+            low, high = new_low, new_high
+
+            rows_found = np.concatenate(found)
+            if len(rows_found) >= limit:
+                distances = np.abs(column[rows_found] - target)
+                kth_distance = float(np.partition(distances, limit - 1)[limit - 1])
+                # Anything outside the window is at least this far from the target.
+                frontier = min(
+                    target - keys[low - 1] if low > 0 else math.inf,
+                    keys[high] - target if high < total else math.inf,
+                )
+                if kth_distance <= frontier:
+                    break
+
+        rows_found = np.concatenate(found) if found else _EMPTY_ROWS
+        lower = upper = None
+        if math.isfinite(kth_distance):
+            lower, upper = target - kth_distance, target + kth_distance
+        candidates = np.unique(np.concatenate([rows_found, self._overlay_rows(plan, "price", lower, upper)]))
+        return _select(candidates, np.abs(column[candidates] - target), limit)
+
+    def _walk_relevance(self, plan: _QueryPlan, target: float | None, limit: int) -> np.ndarray:
+        """Threshold walk for the blended relevance score.
+
+        The price term is walked outward from the target (or cheapest first), km
+        ascending and year newest first, one chunk of each per round. An unseen
+        row scores at least the blend of the three frontier values, so the walk
+        ends once the k-th best score seen is strictly below that bound.
+        """
+        columns = self.store.columns
+        price_scale, km_scale, year_scale = self._scales
+        price_keys, price_rows = self._sorted["price"]
+        km_keys, km_rows = self._sorted["km"]
+        year_keys, year_rows = self._newest_first
+        total = len(price_rows)
+        low = high = int(np.searchsorted(price_keys, target)) if target else 0
+        position = 0
+        best = _EMPTY_ROWS
+        while position < total:
+            end = position + WALK_CHUNK
+            chunks = [km_rows[position:end], year_rows[position:end]]
+            valid = [
+                columns["km"][chunks[0]] == km_keys[position:end],
+                -columns["year"][chunks[1]].astype(np.int64) == year_keys[position:end],
+            ]
+            if target:
+                new_low, new_high = max(low - WALK_CHUNK, 0), min(high + WALK_CHUNK, total)
+                chunks.append(np.concatenate([price_rows[new_low:low], price_rows[high:new_high]]))
+                valid.append(
+                    columns["price"][chunks[-1]]
+                    == np.concatenate([price_keys[new_low:low], price_keys[high:new_high]])
+                )
+                low, high = new_low, new_high
+            else:
+                chunks.append(price_rows[position:end])
+                valid.append(columns["price"][chunks[-1]] == price_keys[position:end])
+                high = min(end, total)
+            position = end
+
+            # Base entries whose value changed since the last compaction are stale.
+            seen = np.concatenate([chunk[mask] for chunk, mask in zip(chunks, valid)])
+            candidates = np.unique(np.concatenate([best, seen[plan.matches(seen)]]))
+            best = _select(candidates, self._score(candidates, "relevance", target), limit)
+            if target and low == 0 and high == total:
+                break
+            if len(best) < limit or position >= total:
+                continue
+            if target:
+                price_frontier = min(
+                    target - price_keys[low - 1] if low > 0 else math.inf,
+                    price_keys[high] - target if high < total else math.inf,
+                )
+            else:
+                price_frontier = price_keys[high]
+            threshold = (
+                price_frontier / price_scale + km_keys[position] / km_scale + year_keys[position] / year_scale
+            )
+            if self._score(best[-1:], "relevance", target)[0] < threshold:
+                break
+
+        candidates = np.unique(np.concatenate([best, self._overlay_rows(plan, "price", None, None)]))
+        return _select(candidates, self._score(candidates, "relevance", target), limit)
+
+    def _overlay_rows(
+        self, plan: _QueryPlan, field: str, lower: float | None, upper: float | None
+    ) -> np.ndarray:
+        overlay = self._sorted_overlay[field]
+        if not overlay:
+            return _EMPTY_ROWS
+        start = bisect_left(overlay, (lower, -1)) if lower is not None else 0
+        end = bisect_right(overlay, (upper, math.inf)) if upper is not None else len(overlay)
+        entries = overlay[start:end]
+        if not entries:
+            return _EMPTY_ROWS
+        rows = np.fromiter((row for _, row in entries), dtype=np.int64, count=len(entries))
+        current = self.store.columns[field][rows]
+        stored = np.fromiter((value for value, _ in entries), dtype=current.dtype, count=len(entries))
+        return rows[(current == stored) & plan.matches(rows)]
+
+    def resolve(self, field: str, value: Any) -> np.ndarray:
+        """Map a free-form make/model filter to the vocabulary codes it matches."""
+        needle = str(value).lower()
+        cache_key = (field, needle)
+        cached = self._resolved.get(cache_key)
+        if cached is not None:
+            return cached
+        vocabulary = self.store.vocabularies[field]
+        # Filters keep substring semantics ("benz" matches "mercedes benz"); the scan
+        # runs over the vocabulary once per distinct filter value, never over rows.
+        codes = np.array(
+            [code for code, lowered in enumerate(vocabulary.lowered) if needle in lowered],
+            dtype=np.int32,
+        )
+        if len(self._resolved) >= MAX_RESOLVED_FILTERS:
+            self._resolved.clear()
+        self._resolved[cache_key] = codes
+        return codes
+
+    def make_codes(self, make: str, exact: bool = True) -> list[int]:
+        """Return make codes equal to (or containing) the given value, case-insensitively."""
+        if not exact:
+            return self.resolve("make", make).tolist()
+        needle = make.lower()
+        return [code for code, lowered in enumerate(self.store.makes.lowered) if lowered == needle]
+
+    def rows_for_models(self, model_codes: Any) -> np.ndarray:
+        """Return live rows carrying any of the given model codes."""
+        rows = self._group_rows("model", model_codes)
+        return np.unique(rows[self.store.alive[rows] & np.isin(self.store.columns["model"][rows], model_codes)])
+
+    def make_for_model(self, model: str) -> str | None:
+        target = model.lower()
+        make_code = self._make_by_model.get(target)
+        if make_code is None:
+            return None
+        models = self.store.models
+        if any(
+            self._pair_counts.get((make_code, code))
+            for code, lowered in enumerate(models.lowered)
+            if lowered == target
+        ):
+            return self.store.makes.values[make_code]
+        # The first make seen for this model is gone; fall back to any live pairing.
+        for (candidate, code), count in _snapshot(self._pair_counts):
+            if count and models.lowered[code] == target:
+                self._make_by_model[target] = candidate
+                return self.store.makes.values[candidate]
+        return None
+
+    def makes(self) -> set[str]:
+        values = self.store.makes.values
+        return {values[code] for code, count in _snapshot(self._make_counts) if count}
+
+    def models(self, make: str | None = None) -> set[str]:
+        values = self.store.models.values
+        if not make:
+            return {values[code] for code, count in _snapshot(self._model_counts) if count}
+        needle = make.lower()
+        lowered_makes = self.store.makes.lowered
+        return {
+            values[model_code]
+            for (make_code, model_code), count in _snapshot(self._pair_counts)
+            if count and lowered_makes[make_code] == needle
+        }
+
+    def add_row(self, row: int) -> None:
+        """Register a row whose current column values should become queryable."""
+        columns = self.store.columns
+        make_code = int(columns["make"][row])
+        model_code = int(columns["model"][row])
+        # Readers may pick the row up from the overlays below at any moment, so its
+        # features must already be in the similarity matrix.
+        self.similarity.update(row)
+        self._group_overlay["make"].setdefault(make_code, []).append(row)
+        self._group_overlay["model"].setdefault(model_code, []).append(row)
+        for name in SORTED_FIELDS:
+            insort(self._sorted_overlay[name], (columns[name][row].item(), row))
+        self._make_counts[make_code] += 1
+        self._model_counts[model_code] += 1
+        self._pair_counts[(make_code, model_code)] += 1
+        self._count_facets(row, 1)
+        self._make_by_model.setdefault(self.store.models.lowered[model_code], make_code)
+        self._resolved.clear()
+        self._overlay_size += 1
+
+    def remove_row(self, row: int) -> None:
+        """Forget a row's current values; call before overwriting or deleting it."""
+        columns = self.store.columns
+        make_code = int(columns["make"][row])
+        model_code = int(columns["model"][row])
+        self._make_counts[make_code] -= 1
+        self._model_counts[model_code] -= 1
+        self._pair_counts[(make_code, model_code)] -= 1
+        self._count_facets(row, -1)
+
+    def facets(self, version: int) -> CatalogFacets:
+        """Aggregate the live counters; safe to call while deltas are being applied."""
+        makes = self.store.makes.values
+        models = self.store.models.values
+        make_counts: Counter[str] = Counter()
+        for code, count in _snapshot(self._make_counts):
+            make_counts[makes[code]] += count
+        pair_counts = {
+            (makes[make_code], models[model_code]): count
+            for (make_code, model_code), count in _snapshot(self._pair_counts)
+        }
+        return CatalogFacets.from_counts(
+            version,
+            make_counts,
+            pair_counts,
+            dict(_snapshot(self._year_counts)),
+            dict(_snapshot(self._price_bucket_counts)),
+            dict(_snapshot(self._km_bucket_counts)),
+        )
+
+    def needs_compaction(self) -> bool:
+        threshold = max(MIN_OVERLAY_BEFORE_COMPACTION, int(len(self.store) * OVERLAY_COMPACTION_RATIO))
+        return self._overlay_size > threshold
+
+    def _count_facets(self, row: int, step: int) -> None:
+        columns = self.store.columns
+        self._year_counts[int(columns["year"][row])] += step
+        self._price_bucket_counts[int(columns["price"][row] // PRICE_BUCKET_MXN)] += step
+        self._km_bucket_counts[int(columns["km"][row] // KM_BUCKET)] += step
+
+    def _group_rows(self, field: str, codes: Any) -> np.ndarray:
+        base = self._by_make if field == "make" else self._by_model
+        overlay = self._group_overlay[field]
+        chunks: list[np.ndarray] = []
+        for code in codes:
+            code = int(code)
+            if code in base:
+                chunks.append(base[code])
+            extra = overlay.get(code)
+            if extra:
+                chunks.append(np.array(extra, dtype=np.int64))
+        if not chunks:
+            return _EMPTY_ROWS
+        if len(chunks) == 1:
+            return chunks[0]
+        return np.concatenate(chunks)
+
+    def _range_rows(self, field: str, lower: float | None = None, upper: float | None = None) -> np.ndarray:
+        keys, rows = self._sorted[field]
+        start = np.searchsorted(keys, lower, side="left") if lower is not None else 0
+        end = np.searchsorted(keys, upper, side="right") if upper is not None else len(keys)
+        base = rows[start:end]
+        overlay = self._sorted_overlay[field]
+        if not overlay:
+            return base
+        overlay_start = bisect_left(overlay, (lower, -1)) if lower is not None else 0
+        overlay_end = bisect_right(overlay, (upper, math.inf)) if upper is not None else len(overlay)
+        if overlay_start >= overlay_end:
+            return base
+        extra = np.fromiter((row for _, row in overlay[overlay_start:overlay_end]), dtype=np.int64)
+        return np.concatenate([base, extra])
+
+    @staticmethod
+    def _group(codes: np.ndarray, rows: np.ndarray) -> dict[int, np.ndarray]:
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        groups: dict[int, np.ndarray] = {}
+        for chunk in np.split(order, boundaries):
+            if len(chunk):
+                groups[int(codes[chunk[0]])] = rows[chunk]
+        return groups
+
+    @staticmethod
+    def _count(codes: np.ndarray) -> Counter[int]:
+        values, counts = np.unique(codes, return_counts=True)
+        return Counter(dict(zip(values.tolist(), counts.tolist())))
+
+    @staticmethod
+    def _sort(values: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(values, kind="stable")
+        return values[order], rows[order]
+
+
+class _QueryPlan:
+    """Resolved preference filters plus the smallest candidate set to scan."""
+
+    __slots__ = (
+        "store",
+        "make_codes",
+        "model_codes",
+        "make_mask",
+        "model_mask",
+        "price_limit",
+        "km_limit",
+        "year_limit",
+        "driver",
+    )
+
+    def __init__(
+        self,
+        store: CatalogStore,
+        make_codes: np.ndarray | None,
+        model_codes: np.ndarray | None,
+        price_limit: float | None,
+        km_limit: int | None,
+        year_limit: int | None,
+    ) -> None:
+        self.store = store
+        self.make_codes = make_codes
+        self.model_codes = model_codes
+        self.price_limit = price_limit
+        self.km_limit = km_limit
+        self.year_limit = year_limit
+        self.make_mask = code_mask(make_codes, len(store.makes)) if make_codes is not None else None
+        self.model_mask = code_mask(model_codes, len(store.models)) if model_codes is not None else None
+        self.driver: np.ndarray | None = None
+
+    def matches(self, rows: np.ndarray) -> np.ndarray:
+        """Vectorized evaluation of every predicate against current column values."""
+        columns = self.store.columns
+        mask = self.store.alive[rows]
+        if self.make_mask is not None:
+            mask &= mask_lookup(self.make_mask, columns["make"][rows])
+        if self.model_mask is not None:
+            mask &= mask_lookup(self.model_mask, columns["model"][rows])
+        if self.price_limit is not None:
+            mask &= columns["price"][rows] <= self.price_limit
+        if self.km_limit is not None:
+            mask &= columns["km"][rows] <= self.km_limit
+        if self.year_limit is not None:
+            mask &= columns["year"][rows] >= self.year_limit
+        return mask
+
+
+def price_ceiling(preferences: dict[str, Any]) -> float | None:
+    """Tightest price bound implied by `max_price` and `max_monthly_payment`.
+
+    A monthly budget becomes a price bound (see `affordable_price`), so it rides
+    on the sorted price index instead of pricing every car; an optional
+    `down_payment` preference raises the bound accordingly.
+    """
+    max_price = preferences.get("max_price")
+    max_payment = preferences.get("max_monthly_payment")
+    if max_payment is None:
+        return max_price
+    bound = affordable_price(float(max_payment), float(preferences.get("down_payment") or 0))
+    return bound if max_price is None else min(float(max_price), bound)
+
+
+def _snapshot(counts: Counter[Any]) -> tuple[tuple[Any, int], ...]:
+    """Copy a counter's items for readers racing `apply_deltas`.
+
+    Deltas add keys while holding only the service's write lock; `tuple()` over a
+    dict view copies it without running Python code, so the GIL keeps the copy
+    consistent where a generator over the live view could raise mid-iteration.
+    """
+    return tuple(counts.items())
+
+
+def _select(rows: np.ndarray, scores: np.ndarray, limit: int) -> np.ndarray:
+    """Pick the `limit` lowest-scoring rows (ties by catalog order) without a full sort."""
+    if len(rows) > limit:
+        keep = np.argpartition(scores, limit - 1)[:limit]
+        # argpartition may cut through a tie; pull every row tied with the cutoff back in.
+        cutoff = scores[keep].max()
+        keep = np.flatnonzero(scores <= cutoff)
+        rows, scores = rows[keep], scores[keep]
+    order = np.lexsort((rows, scores))[:limit]
+    return rows[order]
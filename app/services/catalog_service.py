@@ -2,141 +2,251 @@
 from __future__ import annotations
 
 import csv
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
+
 
 from app.domain.models import Car
+from app.domain.schemas import InventoryDelta
+from app.services.catalog_facets import CatalogFacets
+from app.services.catalog_index import CatalogIndex, price_ceiling
+from app.services.catalog_snapshot import load_snapshot, snapshot_key, write_snapshot
+from app.services.catalog_store import CatalogStore
+
+
+@dataclass(frozen=True)
+class CatalogLoadReport:
+    """Outcome of a catalog (re)load, used for logging and the admin API."""
+
+    source: str
+    rows: int
+    elapsed_ms: float
+    version: int = 0
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class InventoryDeltaReport:
+    """Outcome of applying a batch of inventory deltas."""
+
+    version: int
+    rows: int
+    upserted: int
+    updated: int
+    deleted: int
+    missing: list[str]
+    elapsed_ms: float
 
 
 class CatalogService:
     """Handle catalog data sourced from a CSV file."""
 
-    def __init__(self) -> None:
-        self._catalog: list[Car] = []
-
-    def load_catalog(self, path: str) -> None:
-        """Load catalog data from the provided CSV path."""
+    def __init__(self, snapshot_dir: str | None = None) -> None:
+        self._snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        # Readers grab this single reference once per call; reloads build a complete
+        # replacement and swap it in, so a half-built catalog is never observable.
+        self._index = CatalogIndex(CatalogStore.empty())
+        self._version = 0
+        self._facets: CatalogFacets | None = None
+        self._write_lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """Monotonic counter bumped every time the served catalog changes."""
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self._index.store.positions)
+
+    def load_catalog(self, path: str) -> CatalogLoadReport:
+        """Load (or reload) catalog data from a CSV path, reusing a snapshot when possible.
+
+        Safe to call from a background thread while requests are being served.
+        """
+        with self._write_lock:
+            return self._load(path)
+
+    def apply_deltas(self, deltas: Iterable[InventoryDelta]) -> InventoryDeltaReport:
+        """Apply inventory deltas in place, in time proportional to the batch.
+
+        `upsert` creates a unit or overwrites the fields it carries, `update` only
+        touches existing units and `delete` removes them; unknown stock_ids for
+        `update`/`delete` are reported as missing.
+        """
+        started = time.perf_counter()
+        upserted = updated = deleted = 0
+        missing: list[str] = []
+        with self._write_lock:
+            index = self._index
+            store = index.store
+            for delta in deltas:
+                row = store.positions.get(delta.stock_id)
+                if row is None and delta.op != "upsert":
+                    missing.append(delta.stock_id)
+                    continue
+
+                if delta.op == "delete":
+                    index.remove_row(row)
+                    store.delete(row)
+                    deleted += 1
+                    continue
+
+                values = delta.model_dump(exclude={"op", "stock_id"}, exclude_none=True)
+                if row is None:
+                    row = store.append(delta.stock_id, values)
+                else:
+                    index.remove_row(row)
+                    store.write(row, values)
+                index.add_row(row)
+                if delta.op == "upsert":
+                    upserted += 1
+                else:
+                    updated += 1
+
+            if index.needs_compaction():
+                self._index = CatalogIndex(store)
+            if upserted or updated or deleted:
+                self._version += 1
+            return InventoryDeltaReport(
+                version=self._version,
+                rows=len(store.positions),
+                upserted=upserted,
+                updated=updated,
+                deleted=deleted,
+                missing=missing,
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+            )
+
+    def _load(self, path: str) -> CatalogLoadReport:
+        started = time.perf_counter()
         csv_path = Path(path)
         if not csv_path.exists():
             msg = f"Catalog CSV not found at {path}"
             raise FileNotFoundError(msg)
 
-        with csv_path.open(encoding="utf-8") as csv_file:
-            reader = csv.DictReader(csv_file)
-            self._catalog = [self._row_to_car(row) for row in reader]
+        key = snapshot_key(csv_path) if self._snapshot_dir else None
+        store = load_snapshot(self._snapshot_dir, key) if self._snapshot_dir and key else None
+        source = "snapshot"
+        if store is None:
+            source = "csv"
+            with csv_path.open(encoding="utf-8") as csv_file:
+                reader = csv.DictReader(csv_file)
+                store = CatalogStore.from_rows(reader)
+            if self._snapshot_dir and key:
+                write_snapshot(self._snapshot_dir, key, store)
+
+        index = CatalogIndex(store)
+        added, removed, changed = store.diff(self._index.store)
+        self._index = index
+        self._version += 1
+        return CatalogLoadReport(
+            source=source,
+            rows=len(store),
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+            version=self._version,
+            added=added,
+            removed=removed,
+            changed=changed,
+        )
 
-    def search_cars(self, preferences: dict | None = None) -> list[Car]:
+    def search_cars(self, preferences: dict | None = None, limit: int | None = None) -> list[Car]:
         """Return cars that match user preferences."""
-        if not self._catalog:
+        index = self._index
+        if not index.store.positions:
             return []
 
-        filters = preferences or {}
-        results: list[Car] = []
-        for car in self._catalog:
-            if self._matches_preferences(car, filters):
-                results.append(car)
-        return results
+        rows = index.query(preferences or {})
+        if limit is not None:
+            rows = rows[:limit]
+        return index.store.cars(rows)
+
+    def rank_cars(
+        self,
+        preferences: dict | None = None,
+        limit: int = 3,
+        key: str = "relevance",
+    ) -> list[Car]:
+        """Return the top `limit` matching cars ordered by a ranking key.
+
+        Supported keys: `relevance`, `price_proximity`, `price`, `km` and `year`.
+        """
+        index = self._index
+        if not index.store.positions:
+            return []
+        return index.store.cars(index.top_k(preferences or {}, limit, key=key))
 
     def suggest_alternatives(self, preferences: dict | None = None, limit: int = 3) -> list[Car]:
-        """Return fallback vehicles based on the best available information."""
-        if not self._catalog:
+        """Return fallback vehicles based on the best available information.
+
+        When the customer gave a budget, mileage, year or a known model, the closest
+        cars in feature space are returned (same make/model preferred, not required);
+        otherwise the cheapest units of the requested make are offered.
+        """
+        index = self._index
+        store = index.store
+        if not store.positions:
             return []
 
         filters = preferences or {}
         make = filters.get("make")
-        max_price = filters.get("max_price")
+        model = filters.get("model")
+        make_codes = (index.make_codes(make) or index.make_codes(make, exact=False)) if make else None
+        model_codes = index.resolve("model", model) if model else None
 
-        candidates: list[Car]
-        if make:
-            candidates = [car for car in self._catalog if car.make.lower() == make.lower()]
-            if not candidates:
-                candidates = [car for car in self._catalog if make.lower() in car.make.lower()]
-        else:
-            candidates = list(self._catalog)
+        target = self._similarity_target(index, filters, model_codes)
+        if target:
+            return store.cars(index.nearest(target, limit, make_codes=make_codes, model_codes=model_codes))
 
-        if not candidates:
-            candidates = list(self._catalog)
-
-        if max_price:
-            target = float(max_price)
-            candidates.sort(key=lambda car: abs(car.price - target))
-        else:
-            candidates.sort(key=lambda car: (car.price, car.km))
-
-        return candidates[:limit]
+        if make_codes:
+            rows = index.top_k({}, limit, key="price", make_codes=make_codes)
+            if len(rows):
+                return store.cars(rows)
+        return store.cars(index.top_k({}, limit, key="price"))
 
     @staticmethod
-    def _row_to_car(row: dict[str, Any]) -> Car:
-        """Convert CSV row into a Car model."""
-        return Car(
-            stock_id=row.get("stock_id", ""),
-            km=CatalogService._to_int(row.get("km")),
-            price=CatalogService._to_float(row.get("price")),
-            make=row.get("make", ""),
-            model=row.get("model", ""),
-            year=CatalogService._to_int(row.get("year")),
-            version=row.get("version", ""),
-            bluetooth=CatalogService._to_bool(row.get("bluetooth")),
-            length_mm=CatalogService._to_float(row.get("largo")),
-            width_mm=CatalogService._to_float(row.get("ancho")),
-            height_mm=CatalogService._to_float(row.get("altura")),
-            car_play=CatalogService._to_bool(row.get("car_play")),
-        )
-
-    @staticmethod
-    def _to_int(value: Any) -> int:
-        return int(float(value)) if value not in (None, "", "None") else 0
-
-    @staticmethod
-    def _to_float(value: Any) -> float:
-        return float(value) if value not in (None, "", "None") else 0.0
-
-    @staticmethod
-    def _to_bool(value: Any) -> bool | None:
-        normalized = str(value or "").strip().lower()
-        if not normalized:
-            return None
-        return normalized in {"sí", "si", "true", "1"}
-
-    @staticmethod
-    def _matches_preferences(car: Car, preferences: dict[str, Any]) -> bool:
-        """Evaluate whether a car satisfies the basic preference filters."""
-        make = preferences.get("make")
-        if make and make.lower() not in car.make.lower():
-            return False
-
-        model = preferences.get("model")
-        if model and model.lower() not in car.model.lower():
-            return False
-
-        max_price = preferences.get("max_price")
-        if max_price is not None and car.price > float(max_price):
-            return False
-
-        max_km = preferences.get("max_km")
-        if max_km is not None and car.km > int(max_km):
-            return False
-
-        min_year = preferences.get("min_year")
-        if min_year is not None and car.year < int(min_year):
-            return False
-
-        return True
+    def _similarity_target(index: CatalogIndex, filters: dict, model_codes: Any) -> dict[str, float]:
+        target: dict[str, float] = {}
+        max_price = price_ceiling(filters)
+        if max_price:
+            target["price"] = float(max_price)
+        if filters.get("max_km"):
+            target["km"] = float(filters["max_km"])
+        if filters.get("min_year"):
+            target["year"] = float(filters["min_year"])
+        if model_codes is not None and len(model_codes):
+            # A requested model stands in for a body type: match its dimensions.
+            rows = index.rows_for_models(model_codes)
+            target.update(index.similarity.reference_dimensions(rows))
+        return target
 
     def find_make_by_model(self, model: str) -> str | None:
         """Return the make associated with a model if known."""
-        target = model.lower()
-        for car in self._catalog:
-            if car.model.lower() == target:
-                return car.make
-        return None
+        return self._index.make_for_model(model)
+
+    def facets(self) -> CatalogFacets:
+        """Inventory counts for the served catalog, rebuilt once per catalog version."""
+        version = self._version
+        facets = self._facets
+        if facets is not None and facets.version == version:
+            return facets
+        # Built from counter snapshots without the write lock, so slot options never
+        # wait on a reload. Reading the version first means a concurrent delta can
+        # only make the facets newer than their tag, and the next call rebuilds.
+        facets = self._index.facets(version)
+        current = self._facets
+        if current is None or current.version <= version:
+            self._facets = facets
+        return facets
 
     def list_makes(self) -> set[str]:
         """Return the set of makes currently loaded in the catalog."""
-        return {car.make for car in self._catalog}
+        return self._index.makes()
 
     def list_models(self, make: str | None = None) -> set[str]:
         """Return known models, optionally filtered by make."""
-        if make:
-            return {car.model for car in self._catalog if car.make.lower() == make.lower()}
-        return {car.model for car in self._catalog}
+        return self._index.models(make)
@@ -0,0 +1,105 @@
+"""Versioned on-disk snapshots of the parsed catalog for fast startup."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from app.services.catalog_store import NUMERIC_COLUMNS, TEXT_COLUMNS, CatalogStore, Vocabulary
+
+LOGGER = logging.getLogger(__name__)
+SNAPSHOT_VERSION = 1
+_META_FILE = "meta.json"
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+def snapshot_key(csv_path: Path) -> str:
+    """Fingerprint a CSV by path, size, mtime and content hash."""
+    stat = csv_path.stat()
+    digest = hashlib.sha256()
+    with csv_path.open("rb") as csv_file:
+        for chunk in iter(lambda: csv_file.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    fingerprint = "|".join(
+        [
+            str(SNAPSHOT_VERSION),
+            str(csv_path.resolve()),
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            digest.hexdigest(),
+        ]
+    )
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+
+def load_snapshot(cache_dir: Path, key: str) -> CatalogStore | None:
+    """Map a previously written snapshot, or return None when it is missing or stale."""
+    directory = _snapshot_dir(cache_dir, key)
+    meta_path = directory / _META_FILE
+    if not meta_path.exists():
+        return None
+
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") != SNAPSHOT_VERSION or meta.get("key") != key:
+            return None
+        # Copy-on-write mappings: pages are shared across workers until written to.
+        columns = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="c")
+            for name in (*NUMERIC_COLUMNS, *TEXT_COLUMNS)
+        }
+        vocabularies = {name: Vocabulary(meta["vocabularies"][name]) for name in TEXT_COLUMNS}
+        store = CatalogStore(meta["stock_ids"], vocabularies, columns)
+    except (OSError, ValueError, KeyError) as exc:
+        LOGGER.warning("Ignoring unreadable catalog snapshot at %s: %s", directory, exc)
+        return None
+
+    if any(len(column) != len(store) for column in columns.values()):
+        LOGGER.warning("Ignoring inconsistent catalog snapshot at %s", directory)
+        return None
+    return store
+
+
+def write_snapshot(cache_dir: Path, key: str, store: CatalogStore) -> None:
+    """Persist the store atomically so concurrent workers never read a partial snapshot."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    target = _snapshot_dir(cache_dir, key)
+    if (target / _META_FILE).exists():
+        return
+    staging = Path(tempfile.mkdtemp(prefix=".catalog-", dir=cache_dir))
+    try:
+        for name in store.columns:
+            np.save(staging / f"{name}.npy", np.ascontiguousarray(store.column(name)))
+        meta = {
+            "version": SNAPSHOT_VERSION,
+            "key": key,
+            "rows": len(store),
+            "stock_ids": store.stock_ids,
+            "vocabularies": {name: store.vocabularies[name].values for name in TEXT_COLUMNS},
+        }
+        # Metadata goes last: its presence marks the snapshot as complete.
+        (staging / _META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(staging, target)
+    except OSError as exc:
+        if not (target / _META_FILE).exists():  # another worker may have won the race
+            LOGGER.warning("Could not write catalog snapshot to %s: %s", target, exc)
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging, ignore_errors=True)
+    _prune_stale(cache_dir, keep=target)
+
+
+def _prune_stale(cache_dir: Path, keep: Path) -> None:
+    for directory in cache_dir.glob("catalog-v*"):
+        if directory != keep and directory.is_dir():
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def _snapshot_dir(cache_dir: Path, key: str) -> Path:
+    return cache_dir / f"catalog-v{SNAPSHOT_VERSION}-{key[:32]}"
@@ -0,0 +1,255 @@
+"""Columnar storage for the loaded car catalog."""
+from __future__ import annotations
+
+import sys
+from typing import Any, Iterable
+
+import numpy as np
+
+from app.domain.models import Car
+
+NUMERIC_COLUMNS: dict[str, Any] = {
+    "km": np.int64,
+    "price": np.float64,
+    "year": np.int32,
+    "length_mm": np.float64,
+    "width_mm": np.float64,
+    "height_mm": np.float64,
+    "bluetooth": np.int8,
+    "car_play": np.int8,
+}
+TEXT_COLUMNS = ("make", "model", "version")
+FLAG_COLUMNS = ("bluetooth", "car_play")
+MISSING_FLAG = -1
+_MIN_CAPACITY = 16
+
+
+class Vocabulary:
+    """Interned string table mapping values to compact integer codes."""
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self.values: list[str] = []
+        self.lowered: list[str] = []
+        self._codes: dict[str, int] = {}
+        for value in values:
+            self.intern(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def intern(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            value = sys.intern(value)
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+            self.lowered.append(value.lower())
+        return code
+
+    def code(self, value: str) -> int | None:
+        return self._codes.get(value)
+
+
+class CatalogStore:
+    """Typed column arrays plus interned make/model/version vocabularies.
+
+    Rows are addressed by position; `Car` models are only materialized on demand.
+    Deleted rows stay in place as tombstones (see `alive`) so positions held by
+    indexes remain stable, and columns grow geometrically to absorb appends.
+    """
+
+    def __init__(
+        self,
+        stock_ids: list[str],
+        vocabularies: dict[str, Vocabulary],
+        columns: dict[str, np.ndarray],
+        alive: np.ndarray | None = None,
+    ) -> None:
+        self.stock_ids = stock_ids
+        self.vocabularies = vocabularies
+        self.columns = columns
+        self.alive = alive if alive is not None else np.ones(len(stock_ids), dtype=bool)
+        self.makes = vocabularies["make"]
+        self.models = vocabularies["model"]
+        self.versions = vocabularies["version"]
+        self._positions: dict[str, int] | None = None
+
+    @classmethod
+    def empty(cls) -> CatalogStore:
+        return cls.from_rows([])
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict[str, Any]]) -> CatalogStore:
+        """Build the columnar store from raw CSV rows."""
+        vocabularies = {name: Vocabulary() for name in TEXT_COLUMNS}
+        stock_ids: list[str] = []
+        values: dict[str, list[Any]] = {name: [] for name in (*NUMERIC_COLUMNS, *TEXT_COLUMNS)}
+        intern_make = vocabularies["make"].intern
+        intern_model = vocabularies["model"].intern
+        intern_version = vocabularies["version"].intern
+
+        for row in rows:
+            stock_ids.append(row.get("stock_id", ""))
+            values["km"].append(_to_int(row.get("km")))
+            values["price"].append(_to_float(row.get("price")))
+            values["year"].append(_to_int(row.get("year")))
+            values["length_mm"].append(_to_float(row.get("largo")))
+            values["width_mm"].append(_to_float(row.get("ancho")))
+            values["height_mm"].append(_to_float(row.get("altura")))
+            values["bluetooth"].append(_to_flag(row.get("bluetooth")))
+            values["car_play"].append(_to_flag(row.get("car_play")))
+            values["make"].append(intern_make(row.get("make", "")))
+            values["model"].append(intern_model(row.get("model", "")))
+            values["version"].append(intern_version(row.get("version", "")))
+
+        columns = {name: np.array(values[name], dtype=dtype) for name, dtype in NUMERIC_COLUMNS.items()}
+        for name in TEXT_COLUMNS:
+            columns[name] = np.array(values[name], dtype=np.int32)
+        return cls(stock_ids, vocabularies, columns)
+
+    def __len__(self) -> int:
+        """Number of physical rows, including tombstones."""
+        return len(self.stock_ids)
+
+    @property
+    def positions(self) -> dict[str, int]:
+        """Map each live stock_id to its row, built on first use."""
+        if self._positions is None:
+            alive = self.alive
+            self._positions = {
+                stock_id: row for row, stock_id in enumerate(self.stock_ids) if alive[row]
+            }
+        return self._positions
+
+    def live_rows(self) -> np.ndarray:
+        return np.flatnonzero(self.alive[: len(self)]).astype(np.int64)
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a column trimmed to the physical row count."""
+        return self.columns[name][: len(self)]
+
+    def append(self, stock_id: str, values: dict[str, Any]) -> int:
+        """Add a new row and return its position."""
+        row = len(self)
+        if row >= len(self.alive):
+            self._grow(max(_MIN_CAPACITY, row * 2))
+        # Fields the caller leaves out read as empty text and unknown flags, not
+        # as whatever value happens to own code 0.
+        for name in NUMERIC_COLUMNS:
+            self.columns[name][row] = MISSING_FLAG if name in FLAG_COLUMNS else 0
+        for name in TEXT_COLUMNS:
+            self.columns[name][row] = self.vocabularies[name].intern("")
+        self.alive[row] = True
+        self.write(row, values)
+        self.stock_ids.append(stock_id)
+        self.positions[stock_id] = row
+        return row
+
+    def write(self, row: int, values: dict[str, Any]) -> None:
+        """Overwrite the given fields (using `Car` field names) of an existing row."""
+        for name, value in values.items():
+            if name in TEXT_COLUMNS:
+                self.columns[name][row] = self.vocabularies[name].intern(value or "")
+            elif name in FLAG_COLUMNS:
+                self.columns[name][row] = MISSING_FLAG if value is None else int(bool(value))
+            elif name in NUMERIC_COLUMNS:
+                self.columns[name][row] = value or 0
+
+    def delete(self, row: int) -> None:
+        self.alive[row] = False
+        self.positions.pop(self.stock_ids[row], None)
+
+    def _grow(self, capacity: int) -> None:
+        size = len(self)
+        for name, column in list(self.columns.items()):
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:size] = column[:size]
+            self.columns[name] = grown
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:size] = self.alive[:size]
+        self.alive = alive
+
+    def diff(self, previous: CatalogStore) -> tuple[list[str], list[str], list[str]]:
+        """Return stock_ids added, removed and changed relative to a previous store."""
+        current_positions = self.positions
+        previous_positions = previous.positions
+        added = [stock_id for stock_id in current_positions if stock_id not in previous_positions]
+        removed = [stock_id for stock_id in previous_positions if stock_id not in current_positions]
+        common = [stock_id for stock_id in current_positions if stock_id in previous_positions]
+        if not common:
+            return added, removed, []
+
+        rows = np.array([current_positions[stock_id] for stock_id in common], dtype=np.int64)
+        previous_rows = np.array([previous_positions[stock_id] for stock_id in common], dtype=np.int64)
+        changed = np.zeros(len(common), dtype=bool)
+        for name in NUMERIC_COLUMNS:
+            changed |= self.columns[name][rows] != previous.columns[name][previous_rows]
+        for name in TEXT_COLUMNS:
+            # Codes are local to each vocabulary, so compare the decoded strings.
+            values = np.array(self.vocabularies[name].values, dtype=object)
+            previous_values = np.array(previous.vocabularies[name].values, dtype=object)
+            changed |= values[self.columns[name][rows]] != previous_values[previous.columns[name][previous_rows]]
+        return added, removed, [common[position] for position in np.flatnonzero(changed)]
+
+    def make(self, row: int) -> str:
+        return self.makes.values[self.columns["make"][row]]
+
+    def model(self, row: int) -> str:
+        return self.models.values[self.columns["model"][row]]
+
+    def car(self, row: int) -> Car:
+        """Materialize a single row as a `Car` without re-running validation."""
+        columns = self.columns
+        return Car.model_construct(
+            stock_id=self.stock_ids[row],
+            km=int(columns["km"][row]),
+            price=float(columns["price"][row]),
+            make=self.makes.values[columns["make"][row]],
+            model=self.models.values[columns["model"][row]],
+            year=int(columns["year"][row]),
+            version=self.versions.values[columns["version"][row]],
+            bluetooth=_from_flag(columns["bluetooth"][row]),
+            length_mm=float(columns["length_mm"][row]),
+            width_mm=float(columns["width_mm"][row]),
+            height_mm=float(columns["height_mm"][row]),
+            car_play=_from_flag(columns["car_play"][row]),
+        )
+
+    def cars(self, rows: Iterable[int]) -> list[Car]:
+        return [self.car(int(row)) for row in rows]
+
+
+def code_mask(codes: Iterable[int], size: int) -> np.ndarray:
+    """Boolean lookup table over a vocabulary; `mask_lookup` beats `np.isin`.
+
+    One spare False slot at the end stands for every code interned after the
+    mask was built, so concurrent appends can never index past it.
+    """
+    mask = np.zeros(size + 1, dtype=bool)
+    mask[np.asarray(list(codes), dtype=np.int64)] = True
+    return mask
+
+
+def mask_lookup(mask: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """`mask[codes]`, with codes newer than the mask reading its trailing False slot."""
+    return np.take(mask, codes, mode="clip")
+
+
+def _to_int(value: Any) -> int:
+    return int(float(value)) if value not in (None, "", "None") else 0
+
+
+def _to_float(value: Any) -> float:
+    return float(value) if value not in (None, "", "None") else 0.0
+
+
+def _to_flag(value: Any) -> int:
+    normalized = str(value or "").strip().lower()
+    if not normalized:
+        return MISSING_FLAG
+    return int(normalized in {"sí", "si", "true", "1"})
+
+
+def _from_flag(value: int) -> bool | None:
+    return None if value == MISSING_FLAG else bool(value)
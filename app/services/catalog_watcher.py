@@ -0,0 +1,88 @@
+"""Background polling watcher that hot-reloads the catalog CSV."""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable
+
+from app.services.catalog_service import CatalogLoadReport, CatalogService, InventoryDeltaReport
+from app.services.inventory_deltas import drain_spool
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CatalogWatcher:
+    """Poll the catalog CSV (and an optional delta spool) on a daemon thread."""
+
+    def __init__(
+        self,
+        catalog_service: CatalogService,
+        path: str,
+        interval_seconds: float,
+        on_reload: Callable[[CatalogLoadReport], None] | None = None,
+        spool_dir: str | None = None,
+        on_deltas: Callable[[InventoryDeltaReport], None] | None = None,
+    ) -> None:
+        self.catalog_service = catalog_service
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.on_reload = on_reload
+        self.spool_dir = Path(spool_dir) if spool_dir else None
+        self.on_deltas = on_deltas
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._fingerprint = self._stat()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval_seconds + 1)
+            self._thread = None
+
+    def poll(self) -> CatalogLoadReport | None:
+        """Reload once if the file changed since the last poll."""
+        fingerprint = self._stat()
+        if fingerprint is None or fingerprint == self._fingerprint:
+            return None
+        report = self.catalog_service.load_catalog(self.path)
+        self._fingerprint = fingerprint
+        if self.on_reload:
+            self.on_reload(report)
+        return report
+
+    def drain(self) -> list[InventoryDeltaReport]:
+        """Apply pending delta batches from the spool directory."""
+        if not self.spool_dir or not self.spool_dir.is_dir():
+            return []
+        reports = drain_spool(self.spool_dir, self.catalog_service)
+        if self.on_deltas:
+            for report in reports:
+                self.on_deltas(report)
+        return reports
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.poll()
+            except Exception as exc:  # pragma: no cover - keep the watcher alive
+                LOGGER.warning("Catalog reload failed: %s", exc)
+            try:
+                self.drain()
+            except Exception as exc:  # pragma: no cover - keep the watcher alive
+                LOGGER.warning("Inventory delta spool failed: %s", exc)
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
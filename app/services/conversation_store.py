@@ -2,9 +2,134 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Any
 
+import orjson
 import redis
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+HISTORY_LIMIT = 5
+MAX_FLUSH_ATTEMPTS = 3
+
+# Compare-and-set on the state's version field: write only if nobody else flushed
+# since we loaded, otherwise hand back the current blob so the caller can rebase.
+_CAS_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+local version = 0
+if current then
+    version = tonumber(cjson.decode(current)['version']) or 0
+end
+if version ~= tonumber(ARGV[1]) then
+    return {0, current or ''}
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return {1, ''}
+"""
+
+
+class ConversationConflictError(RedisError):
+    """Raised when a session keeps losing the race against concurrent writers."""
+
+
+class ConversationSession:
+    """One user's state, loaded once per turn, mutated in memory and flushed once.
+
+    Every mutation is recorded in an operation log so that, if another writer
+    flushed first, the same operations can be replayed on top of their state.
+    """
+
+    def __init__(self, user_id: str, state: dict | None = None) -> None:
+        self.user_id = user_id
+        self.state: dict = state or {}
+        self.version = int(self.state.get("version", 0))
+        self._ops: list[tuple[str, tuple[Any, ...]]] = []
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._ops)
+
+    @property
+    def preferences(self) -> dict:
+        return dict(self.state.get("preferences", {}))
+
+    @property
+    def expected_slot(self) -> str | None:
+        return self.state.get("expected_slot")
+
+    @property
+    def question(self) -> dict | None:
+        return self.state.get("question")
+
+    def save_turn(self, payload: dict) -> None:
+        self._record("save_turn", datetime.utcnow().isoformat(), payload)
+
+    def store_preferences(self, preferences: dict) -> None:
+        self._record("store_preferences", dict(preferences))
+
+    def set_expected_slot(self, slot: str | None) -> None:
+        self._record("set_expected_slot", slot)
+
+    def set_question(self, slot: str, options: list[str], metadata: dict | None = None) -> None:
+        self._record("set_question", slot, list(options), metadata or {})
+
+    def clear_question(self) -> None:
+        if "question" in self.state:
+            self._record("clear_question")
+
+    def rebase(self, state: dict) -> None:
+        """Replay this turn's operations on top of a newer stored state."""
+        self.state = state
+        self.version = int(state.get("version", 0))
+        for name, args in self._ops:
+            getattr(self, f"_apply_{name}")(*args)
+
+    def pending_write(self, ttl: int) -> list[Any]:
+        """Arguments for the compare-and-set script: expected version, new blob, TTL."""
+        state = {**self.state, "version": self.version + 1}
+        try:
+            blob: bytes | str = orjson.dumps(state)
+        except TypeError:
+            # orjson refuses integers beyond 64 bits; client preferences may carry them.
+            blob = json.dumps(state)
+        return [self.version, blob, ttl]
+
+    def resolve_write(self, written: Any, current: str | None) -> bool:
+        """Apply a compare-and-set reply; on conflict rebase and report failure."""
+        if int(written):
+            self.mark_flushed(self.version + 1)
+            return True
+        self.rebase(orjson.loads(current) if current else {})
+        return False
+
+    def mark_flushed(self, version: int) -> None:
+        self.state["version"] = version
+        self.version = version
+        self._ops.clear()
+
+    def _record(self, name: str, *args: Any) -> None:
+        self._ops.append((name, args))
+        getattr(self, f"_apply_{name}")(*args)
+
+    def _apply_save_turn(self, timestamp: str, payload: dict) -> None:
+        history = self.state.get("history", [])
+        history.append({"ts": timestamp, "payload": payload})
+        self.state["history"] = history[-HISTORY_LIMIT:]
+
+    def _apply_store_preferences(self, preferences: dict) -> None:
+        stored = self.state.get("preferences", {})
+        stored.update(preferences)
+        self.state["preferences"] = stored
+
+    def _apply_set_expected_slot(self, slot: str | None) -> None:
+        self.state["expected_slot"] = slot
+
+    def _apply_set_question(self, slot: str, options: list[str], metadata: dict) -> None:
+        self.state["question"] = {"slot": slot, "options": options, "metadata": metadata}
+
+    def _apply_clear_question(self) -> None:
+        self.state.pop("question", None)
 
 
 class ConversationStore:
@@ -13,53 +138,121 @@ class ConversationStore:
     def __init__(self, redis_url: str, ttl_minutes: int = 30) -> None:
         self.client = redis.Redis.from_url(redis_url, decode_responses=True)
         self.ttl = ttl_minutes * 60
+        self._compare_and_set = self.client.register_script(_CAS_SCRIPT)
+
+    def load_session(self, user_id: str) -> ConversationSession:
+        """Read the user's state in a single round trip."""
+        return ConversationSession(user_id, self.get_state(user_id))
+
+    def flush_session(self, session: ConversationSession) -> None:
+        """Write the session back in one compare-and-set round trip.
+
+        On a version conflict the session is rebased onto the newer state and the
+        write retried; concurrent turns are merged instead of overwritten.
+        """
+        if not session.dirty:
+            return
+        key = _key(session.user_id)
+        for _ in range(MAX_FLUSH_ATTEMPTS):
+            written, current = self._compare_and_set(keys=[key], args=session.pending_write(self.ttl))
+            if session.resolve_write(written, current):
+                return
+        raise _conflict(session)
 
     def save_turn(self, user_id: str, payload: dict) -> None:
-        key = self._key(user_id)
-        existing = self.get_state(user_id)
-        history = existing.get("history", []) if existing else []
-        history.append({"ts": datetime.utcnow().isoformat(), "payload": payload})
-        state = {"history": history[-5:]}
-        self.client.set(key, json.dumps(state), ex=self.ttl)
+        session = self.load_session(user_id)
+        session.save_turn(payload)
+        self.flush_session(session)
 
     def get_state(self, user_id: str) -> dict:
-        raw = self.client.get(self._key(user_id))
-        return json.loads(raw) if raw else {}
+        raw = self.client.get(_key(user_id))
+        return orjson.loads(raw) if raw else {}
 
     def store_preferences(self, user_id: str, preferences: dict) -> None:
-        state = self.get_state(user_id)
-        stored = state.get("preferences", {})
-        stored.update(preferences)
-        state["preferences"] = stored
-        self.client.set(self._key(user_id), json.dumps(state), ex=self.ttl)
+        session = self.load_session(user_id)
+        session.store_preferences(preferences)
+        self.flush_session(session)
 
     def get_preferences(self, user_id: str) -> dict:
-        state = self.get_state(user_id)
-        return state.get("preferences", {})
+        return self.load_session(user_id).preferences
 
     def set_expected_slot(self, user_id: str, slot: str | None) -> None:
-        state = self.get_state(user_id)
-        state["expected_slot"] = slot
-        self.client.set(self._key(user_id), json.dumps(state), ex=self.ttl)
+        session = self.load_session(user_id)
+        session.set_expected_slot(slot)
+        self.flush_session(session)
 
     def get_expected_slot(self, user_id: str) -> str | None:
-        state = self.get_state(user_id)
-        return state.get("expected_slot")
+        return self.load_session(user_id).expected_slot
 
     def set_question(self, user_id: str, slot: str, options: list[str], metadata: dict | None = None) -> None:
-        state = self.get_state(user_id)
-        state["question"] = {"slot": slot, "options": options, "metadata": metadata or {}}
-        self.client.set(self._key(user_id), json.dumps(state), ex=self.ttl)
+        session = self.load_session(user_id)
+        session.set_question(slot, options, metadata)
+        self.flush_session(session)
 
     def get_question(self, user_id: str) -> dict | None:
-        state = self.get_state(user_id)
-        return state.get("question")
+        return self.load_session(user_id).question
 
     def clear_question(self, user_id: str) -> None:
-        state = self.get_state(user_id)
-        if "question" in state:
-            state.pop("question")
-            self.client.set(self._key(user_id), json.dumps(state), ex=self.ttl)
+        session = self.load_session(user_id)
+        session.clear_question()
+        self.flush_session(session)
+
+
+
+class AsyncConversationStore:
+    """asyncio flavour of `ConversationStore` backed by a shared connection pool.
+
+    Waiting on Redis yields to the event loop, so one worker keeps serving other
+    conversations. Sessions and the compare-and-set flush behave exactly like the
+    synchronous store.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        ttl_minutes: int = 30,
+        max_connections: int = 50,
+        socket_timeout: float | None = 2.0,
+        connect_timeout: float | None = 2.0,
+        health_check_interval: int = 30,
+    ) -> None:
+        self.pool = aioredis.ConnectionPool.from_url(
+            redis_url,
+            decode_responses=True,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=connect_timeout,
+            health_check_interval=health_check_interval,
+        )
+        self.client = aioredis.Redis(connection_pool=self.pool)
+        self.ttl = ttl_minutes * 60
+        self._compare_and_set = self.client.register_script(_CAS_SCRIPT)
+
+    async def load_session(self, user_id: str) -> ConversationSession:
+        return ConversationSession(user_id, await self.get_state(user_id))
+
+    async def flush_session(self, session: ConversationSession) -> None:
+        if not session.dirty:
+            return
+        key = _key(session.user_id)
+        for _ in range(MAX_FLUSH_ATTEMPTS):
+            written, current = await self._compare_and_set(keys=[key], args=session.pending_write(self.ttl))
+            if session.resolve_write(written, current):
+                return
+        raise _conflict(session)
+
+    async def get_state(self, user_id: str) -> dict:
+        raw = await self.client.get(_key(user_id))
+        return orjson.loads(raw) if raw else {}
+
+    async def close(self) -> None:
+        await self.client.aclose()
+        await self.pool.disconnect()
+
+
+def _key(user_id: str) -> str:
+    return f"conversation:{user_id}"
+
 
-    def _key(self, user_id: str) -> str:
-        return f"conversation:{user_id}"
+def _conflict(session: ConversationSession) -> ConversationConflictError:
+    return ConversationConflictError(f"Conversation state for {session.user_id} kept changing during flush.")
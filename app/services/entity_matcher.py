@@ -0,0 +1,241 @@
+"""Single-pass make/model spotting over free-form messages."""
+from __future__ import annotations
+
+import re
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+from typing import Iterable
+
+from app.services.catalog_service import CatalogService
+from app.services.fast_intent import normalize
+
+ALIAS_BRANDS = {
+    "vw": "Volkswagen",
+    "volks": "Volkswagen",
+    "chevy": "Chevrolet",
+    "bmw": "BMW",
+}
+ALIAS_MODELS = {
+    "vento": "Vento",
+    "vocho": "Sedan",
+    "cx5": "CX-5",
+}
+# Shorter model names ("A3", "Ka") collide with ordinary words and amounts.
+MIN_MODEL_LENGTH = 3
+# Five-letter names sit one edit away from everyday words ("March"/"marca",
+# "Civic"/"civil"), so only longer names are matched approximately.
+FUZZY_MIN_LENGTH = 6
+TRIGRAM_MIN_DICE = 0.4
+WORD_PATTERN = re.compile(r"\S+")
+
+
+@dataclass(frozen=True)
+class EntityMatch:
+    """A make or model found in a normalized message; `makes` lists a model's catalog makes."""
+
+    kind: str
+    value: str
+    start: int
+    end: int
+    alias: bool = False
+    makes: tuple[str, ...] = ()
+    confidence: float = 1.0
+
+
+@dataclass(frozen=True)
+class _Pattern:
+    kind: str
+    value: str
+    length: int
+    alias: bool
+    makes: tuple[str, ...]
+
+
+class EntityMatcher:
+    """Aho-Corasick automaton over catalog makes, models and their aliases.
+
+    Patterns and messages go through the same `normalize`, so "CX-5", "cx 5" and
+    "Cx-5" meet on "cx 5". Matches must start and end on word boundaries.
+    """
+
+    def __init__(
+        self,
+        makes: Iterable[str],
+        model_makes: dict[str, tuple[str, ...]],
+        version: int = 0,
+    ) -> None:
+        self.version = version
+        self.model_makes = model_makes
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._outputs: list[list[_Pattern]] = [[]]
+        self._terms: list[tuple[str, _Pattern]] = []
+        for make in makes:
+            self._add(make, "make", make)
+        for model, owners in model_makes.items():
+            if len(model) >= MIN_MODEL_LENGTH:
+                self._add(model, "model", model, makes=owners)
+        for alias, make in ALIAS_BRANDS.items():
+            self._add(alias, "make", make, alias=True)
+        for alias, model in ALIAS_MODELS.items():
+            self._add(alias, "model", model, alias=True, makes=model_makes.get(model, ()))
+        self._link()
+        self.fuzzy = FuzzyEntityResolver(self._terms)
+
+    @classmethod
+    def from_catalog(cls, catalog_service: CatalogService) -> EntityMatcher:
+        version = catalog_service.version
+        makes = sorted(catalog_service.list_makes())
+        owners: dict[str, list[str]] = {}
+        for make in makes:
+            for model in catalog_service.list_models(make):
+                owners.setdefault(model, []).append(make)
+        return cls(makes, {model: tuple(found) for model, found in owners.items()}, version)
+
+    def find(self, message: str) -> list[EntityMatch]:
+        """Return every make/model mention in order of appearance."""
+        text = normalize(message)
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        matches: list[EntityMatch] = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            end = position + 1
+            if not outputs[node] or (end < len(text) and text[end] != " "):
+                continue
+            for pattern in outputs[node]:
+                start = end - pattern.length
+                if start == 0 or text[start - 1] == " ":
+                    matches.append(
+                        EntityMatch(pattern.kind, pattern.value, start, end, pattern.alias, pattern.makes)
+                    )
+        matches.sort(key=lambda match: (match.start, -match.end))
+        return matches
+
+    def _add(
+        self,
+        surface: str,
+        kind: str,
+        value: str,
+        alias: bool = False,
+        makes: tuple[str, ...] = (),
+    ) -> None:
+        key = normalize(surface)
+        if not key:
+            return
+        node = 0
+        for char in key:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = child
+        pattern = _Pattern(kind, value, len(key), alias, makes)
+        self._outputs[node].append(pattern)
+        self._terms.append((key, pattern))
+
+    def _link(self) -> None:
+        """Compute failure links breadth-first and merge each node's suffix outputs."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+                queue.append(child)
+
+
+class FuzzyEntityResolver:
+    """Resolve misspelled makes and models through a character-trigram inverted index.
+
+    Shared trigrams shortlist candidate terms, a bounded Levenshtein distance
+    confirms them, and confidence is `1 - distance / len(term)`.
+    """
+
+    def __init__(self, terms: Iterable[tuple[str, _Pattern]]) -> None:
+        self._terms: list[tuple[str, _Pattern, set[str]]] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        self._max_words = 1
+        for key, pattern in terms:
+            if len(key) < FUZZY_MIN_LENGTH:
+                continue
+            grams = _trigrams(key)
+            for gram in grams:
+                self._postings[gram].append(len(self._terms))
+            self._terms.append((key, pattern, grams))
+            self._max_words = max(self._max_words, key.count(" ") + 1)
+
+    def resolve(
+        self,
+        message: str,
+        min_confidence: float,
+        skip: Iterable[tuple[int, int]] = (),
+    ) -> list[EntityMatch]:
+        """Return the best approximate match for each word window outside the `skip` spans."""
+        text = normalize(message)
+        shortest = FUZZY_MIN_LENGTH * min_confidence
+        taken = list(skip)
+        words = [word.span() for word in WORD_PATTERN.finditer(text)]
+        matches: list[EntityMatch] = []
+        for first in range(len(words)):
+            for last in range(first, min(first + self._max_words, len(words))):
+                start, end = words[first][0], words[last][1]
+                window = text[start:end]
+                if len(window) < shortest or window.isdigit() or any(start < right and left < end for left, right in taken):
+                    continue
+                found = self._best(window, min_confidence)
+                if found:
+                    pattern, confidence = found
+                    matches.append(
+                        EntityMatch(pattern.kind, pattern.value, start, end, pattern.alias, pattern.makes, confidence)
+                    )
+        return matches
+
+    def _best(self, window: str, min_confidence: float) -> tuple[_Pattern, float] | None:
+        grams = _trigrams(window)
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        best: tuple[_Pattern, float] | None = None
+        for index, count in shared.items():
+            key, pattern, term_grams = self._terms[index]
+            if 2 * count / (len(grams) + len(term_grams)) < TRIGRAM_MIN_DICE:
+                continue
+            # The confidence floor caps the distance worth computing.
+            distance = bounded_levenshtein(window, key, int(len(key) * (1 - min_confidence) + 1e-9))
+            if distance is None:
+                continue
+            confidence = 1 - distance / len(key)
+            if best is None or confidence > best[1]:
+                best = (pattern, confidence)
+        return best
+
+
+def bounded_levenshtein(left: str, right: str, bound: int) -> int | None:
+    """Edit distance between the strings, or None as soon as it must exceed `bound`."""
+    if abs(len(left) - len(right)) > bound:
+        return None
+    previous = list(range(len(right) + 1))
+    for row, left_char in enumerate(left, start=1):
+        current = [row]
+        for column, right_char in enumerate(right, start=1):
+            current.append(
+                min(previous[column] + 1, current[column - 1] + 1, previous[column - 1] + (left_char != right_char))
+            )
+        if min(current) > bound:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= bound else None
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[index : index + 3] for index in range(len(padded) - 2)}
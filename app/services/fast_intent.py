@@ -0,0 +1,162 @@
+"""Local intent tier: keyword rules plus a small naive Bayes model."""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Iterable
+
+LOGGER = logging.getLogger(__name__)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+ALLOWED_INTENTS: set[str] = {"greeting", "small_talk", "recommendation", "financing", "faq", "off_topic", "ambiguous"}
+
+GREETING = r"(hola|buen[oa]s?( dias| tardes| noches)?|hey|que tal|saludos)"
+# Words that may follow a greeting without carrying a request; anything else
+# ("hola toyota", "buenas tardes mazda") falls through to the other tiers.
+GREETING_FILLERS = r"(amig[oa]s?|equipo|kavak|a todos|como estas|" + GREETING + ")"
+
+# (intent, pattern over accent-stripped lowercase text, confidence). Greeting and
+# small-talk rules are anchored so "hola, busco un Jetta" is not a bare greeting.
+RULES: list[tuple[str, re.Pattern[str], float]] = [
+    ("greeting", re.compile(rf"^{GREETING}( {GREETING_FILLERS})?$"), 0.98),
+    (
+        "small_talk",
+        re.compile(r"^(muchas )?(gracias|ok|okay|vale|perfecto|genial|excelente|de acuerdo|adios|bye)$"),
+        0.95,
+    ),
+    # A bare "tasa" is often about something else ("tasa de cambio del dolar"), so it
+    # only counts when a vehicle is mentioned after it.
+    (
+        "financing",
+        re.compile(
+            r"\b(financ\w*|mensualidad\w*|enganche|credito|plazos?|interes\w*)\b"
+            r"|\btasas?\b(?=.*\b(autos?|carros?|coches?|camionetas?|vehiculos?|seminuevos?)\b)"
+        ),
+        0.9,
+    ),
+    ("faq", re.compile(r"\b(garantia\w*|propuesta de valor|devolucion\w*|inspeccion\w*|certificad\w*|sucursal\w*)\b"), 0.9),
+    (
+        "recommendation",
+        re.compile(r"\b(busco|buscando|recomienda\w*|quiero (un|una|comprar)|me interesa|suv|sedan|hatchback|pickup)\b"),
+        0.9,
+    ),
+]
+
+# Seed corpus so the model works before any logged turns are available.
+SEED_EXAMPLES: list[tuple[str, str]] = [
+    ("hola buenas tardes", "greeting"),
+    ("buen dia que tal", "greeting"),
+    ("hola como estas", "greeting"),
+    ("gracias por la ayuda", "small_talk"),
+    ("ok perfecto gracias", "small_talk"),
+    ("jaja que bien", "small_talk"),
+    ("busco un auto familiar", "recommendation"),
+    ("que autos tienen de menos de 300 mil", "recommendation"),
+    ("recomiendame una camioneta", "recommendation"),
+    ("quiero un toyota 2019 con pocos kilometros", "recommendation"),
+    ("cuanto pagaria al mes con enganche", "financing"),
+    ("me pueden financiar a 4 años", "financing"),
+    ("que tasa de interes manejan", "financing"),
+    ("que garantia tienen los autos", "faq"),
+    ("por que comprar en kavak", "faq"),
+    ("como funciona la devolucion", "faq"),
+    ("quien gano el partido ayer", "off_topic"),
+    ("cual es la capital de francia", "off_topic"),
+    ("cuentame un chiste", "off_topic"),
+]
+
+
+def normalize(message: str) -> str:
+    """Lowercase, strip accents and collapse punctuation into single spaces."""
+    decomposed = unicodedata.normalize("NFKD", message.lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(TOKEN_PATTERN.findall(stripped))
+
+
+class NaiveBayesIntentModel:
+    """Multinomial naive Bayes over word unigrams with Laplace smoothing."""
+
+    def __init__(self, samples: Iterable[tuple[str, str]] = ()) -> None:
+        self._token_counts: dict[str, Counter[str]] = defaultdict(Counter)
+        self._intent_counts: Counter[str] = Counter()
+        self._vocabulary: set[str] = set()
+        self.train(samples)
+
+    def train(self, samples: Iterable[tuple[str, str]]) -> None:
+        for message, intent in samples:
+            tokens = normalize(message).split()
+            self._intent_counts[intent] += 1
+            self._token_counts[intent].update(tokens)
+            self._vocabulary.update(tokens)
+
+    def predict(self, text: str) -> tuple[str, float]:
+        """Return the most likely intent for normalized text and its confidence.
+
+        The posterior is scaled by the share of known tokens, so messages made of
+        unseen words never look confident.
+        """
+        tokens = text.split()
+        known = [token for token in tokens if token in self._vocabulary]
+        if not known or not self._intent_counts:
+            return "ambiguous", 0.0
+        total = sum(self._intent_counts.values())
+        vocabulary_size = len(self._vocabulary)
+        scores: dict[str, float] = {}
+        for intent, count in self._intent_counts.items():
+            token_counts = self._token_counts[intent]
+            denominator = sum(token_counts.values()) + vocabulary_size
+            score = math.log(count / total)
+            for token in known:
+                score += math.log((token_counts[token] + 1) / denominator)
+            scores[intent] = score
+        best = max(scores, key=scores.__getitem__)
+        posterior = 1.0 / sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, posterior * len(known) / len(tokens)
+
+
+class FastIntentClassifier:
+    """Microsecond intent guesses; callers fall back to the LLM below their threshold."""
+
+    def __init__(self, training_path: str | None = None) -> None:
+        self.model = NaiveBayesIntentModel(SEED_EXAMPLES)
+        if training_path:
+            self.model.train(self._load_samples(Path(training_path)))
+
+    def classify(self, message: str) -> tuple[str, float]:
+        text = normalize(message)
+        if not text:
+            return "ambiguous", 0.0
+        matched = {intent: confidence for intent, pattern, confidence in RULES if pattern.search(text)}
+        if len(matched) == 1:
+            return next(iter(matched.items()))
+        intent, confidence = self.model.predict(text)
+        if matched and intent not in matched:
+            # Rules disagree with each other and with the model; let the LLM decide.
+            return intent, 0.0
+        return intent, confidence
+
+    @staticmethod
+    def _load_samples(path: Path) -> list[tuple[str, str]]:
+        """Read `{"message": ..., "intent": ...}` lines, e.g. exported from logged turns."""
+        if not path.exists():
+            LOGGER.warning("Intent training file not found at %s", path)
+            return []
+        samples: list[tuple[str, str]] = []
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                message, intent = str(record["message"]), str(record["intent"])
+            except (json.JSONDecodeError, KeyError, TypeError):
+                LOGGER.warning("Skipping malformed intent training line: %s", line[:80])
+                continue
+            if intent not in ALLOWED_INTENTS:
+                LOGGER.warning("Skipping intent training line with unknown label: %s", intent[:40])
+                continue
+            samples.append((message, intent))
+        return samples
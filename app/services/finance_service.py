@@ -2,17 +2,23 @@
 
 from __future__ import annotations
 
+from typing import Any
+
+import numpy as np
+
 from app.domain.models import FinancingPlan
 
 MIN_YEARS = 3
 MAX_YEARS = 6
+DEFAULT_INTEREST_RATE = 0.10
+TERM_YEARS = tuple(range(MIN_YEARS, MAX_YEARS + 1))
 
 
 def calculate_financing(
     price: float,
     down_payment: float,
     years: int,
-    interest_rate: float = 0.10,
+    interest_rate: float = DEFAULT_INTEREST_RATE,
 ) -> FinancingPlan:
     """Calculate a financing plan for a vehicle purchase."""
     _validate_inputs(price, down_payment, years, interest_rate)
@@ -38,6 +44,60 @@ def calculate_financing(
     )
 
 
+def payment_factors(
+    years: Any = TERM_YEARS,
+    interest_rates: Any = DEFAULT_INTEREST_RATE,
+) -> np.ndarray:
+    """Monthly payment per peso financed, shaped `(len(years), len(interest_rates))`."""
+    years = np.atleast_1d(np.asarray(years, dtype=np.int64))
+    rates = np.atleast_1d(np.asarray(interest_rates, dtype=np.float64))
+    if years.min() < MIN_YEARS or years.max() > MAX_YEARS:
+        raise ValueError(f"Years must be between {MIN_YEARS} and {MAX_YEARS}.")
+    if rates.min() < 0:
+        raise ValueError("Interest rate must be non-negative.")
+
+    months = years[:, None] * 12.0
+    monthly_rates = rates[None, :] / 12
+    growth = (1 + monthly_rates) ** months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factors = monthly_rates * growth / (growth - 1)
+    return np.where(monthly_rates == 0, 1 / months, factors)
+
+
+def calculate_financing_batch(
+    prices: Any,
+    down_payments: Any = 0.0,
+    years: Any = TERM_YEARS,
+    interest_rates: Any = DEFAULT_INTEREST_RATE,
+) -> np.ndarray:
+    """Monthly payments for every price × term × rate in one vectorized pass.
+
+    Returns an array shaped `(len(prices), len(years), len(interest_rates))`,
+    rounded like `calculate_financing`. `down_payments` is a scalar or one value
+    per price; prices the down payment does not leave a principal for come back
+    as NaN instead of raising, so a whole catalog can be priced at once.
+    """
+    prices = np.atleast_1d(np.asarray(prices, dtype=np.float64))
+    down_payments = np.broadcast_to(np.asarray(down_payments, dtype=np.float64), prices.shape)
+    principal = prices - down_payments
+    principal = np.where((prices > 0) & (down_payments >= 0) & (principal > 0), principal, np.nan)
+    return np.round(principal[:, None, None] * payment_factors(years, interest_rates)[None, :, :], 2)
+
+
+def affordable_price(
+    max_monthly_payment: float,
+    down_payment: float = 0.0,
+    interest_rate: float = DEFAULT_INTEREST_RATE,
+) -> float:
+    """Highest price whose monthly payment fits the budget on the longest allowed term.
+
+    Payments grow linearly with price and shrink with the term, so this single
+    bound is exactly the set of cars affordable on at least one term.
+    """
+    factor = float(payment_factors(MAX_YEARS, interest_rate)[0, 0])
+    return max_monthly_payment / factor + down_payment
+
+
 def _validate_inputs(price: float, down_payment: float, years: int, interest_rate: float) -> None:
     if price <= 0:
         raise ValueError("Price must be greater than zero.")
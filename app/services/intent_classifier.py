@@ -1,19 +1,30 @@
 """LLM-powered intent classifier to guide conversational flow."""
 from __future__ import annotations
 
-from typing import Literal
+import hashlib
+import time
+from typing import Literal, cast
 
 import logging
 
-from openai import OpenAI
+import redis.asyncio as aioredis
+from openai import AsyncOpenAI
+
+from app.services.cache import TieredCache
+from app.services.fast_intent import ALLOWED_INTENTS, FastIntentClassifier, normalize
+from app.services.metrics import METRICS, record_usage
 
 Intent = Literal["greeting", "small_talk", "recommendation", "financing", "faq", "off_topic", "ambiguous"]
 
-PROMPT = (
-    "Clasifica el siguiente mensaje de cliente en una de las categorías: "
+INTENT_CATEGORIES = (
     "greeting (saludo), small_talk (charla casual), recommendation (solicita recomendaciones de autos), "
     "financing (pregunta por financiamiento), faq (propuesta de valor o garantías), off_topic (otros temas), "
-    "ambiguous (no queda claro). Responde solo con la etiqueta. Mensaje: {message}"
+    "ambiguous (no queda claro)"
+)
+# Fixed instructions in the system turn; the client's message goes unwrapped as the user turn.
+SYSTEM_PROMPT = (
+    "Clasifica el mensaje del cliente en una de las categorías: "
+    f"{INTENT_CATEGORIES}. Responde solo con la etiqueta."
 )
 
 
@@ -21,26 +32,64 @@ LOGGER = logging.getLogger(__name__)
 
 
 class IntentClassifier:
-    def __init__(self, api_key: str | None, model: str = "gpt-4o-mini") -> None:
-        self.client = OpenAI(api_key=api_key) if api_key else None
+    """Answer from the local tier when it is confident enough, otherwise ask the LLM."""
+
+    def __init__(
+        self,
+        api_key: str | None,
+        model: str = "gpt-4o-mini",
+        timeout: float | None = None,
+        fast_path_threshold: float = 0.85,
+        training_path: str | None = None,
+        cache_size: int = 4096,
+        cache_ttl_seconds: int = 86400,
+        cache_redis: aioredis.Redis | None = None,
+    ) -> None:
+        self.client = AsyncOpenAI(api_key=api_key, timeout=timeout) if api_key else None
         self.model = model
+        self.fast_path_threshold = fast_path_threshold
+        self.fast_path = FastIntentClassifier(training_path)
+        # Classification runs at temperature 0, so identical (model, prompt, text) triples
+        # are safe to memoize; hashing model and prompt into the namespace retires stale entries.
+        fingerprint = hashlib.sha256("\0".join((model, SYSTEM_PROMPT)).encode("utf-8")).hexdigest()[:16]
+        self.cache = TieredCache("intent", fingerprint, cache_size, cache_ttl_seconds, cache_redis)
 
-    def classify(self, message: str) -> Intent:
+    async def classify(self, message: str) -> Intent:
+        resolved = await self.classify_local(message)
+        if resolved is not None:
+            return resolved
         if not self.client:
             return "ambiguous"
 
+        key = normalize(message)
+        started = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 temperature=0,
                 messages=[
-                    {"role": "system", "content": "Sigue las instrucciones."},
-                    {"role": "user", "content": PROMPT.format(message=message)},
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": message},
                 ],
             )
             content = (response.choices[0].message.content or "ambiguous").strip().lower()
         except Exception as exc:  # pragma: no cover - network guard
             LOGGER.warning("Intent classification failed: %s", exc)
             return "ambiguous"
-        allowed: set[str] = {"greeting", "small_talk", "recommendation", "financing", "faq", "off_topic", "ambiguous"}
-        return content if content in allowed else "ambiguous"
+        METRICS.increment("intent.llm")
+        METRICS.observe("intent.llm", (time.perf_counter() - started) * 1000)
+        record_usage("intent.llm", response.usage)
+        intent = content if content in ALLOWED_INTENTS else "ambiguous"
+        await self.cache.set(key, intent)
+        return cast(Intent, intent)
+
+    async def classify_local(self, message: str) -> Intent | None:
+        """Resolve the intent without an LLM call (fast path, then cache), or return None."""
+        intent, confidence = self.fast_path.classify(message)
+        if confidence >= self.fast_path_threshold and intent in ALLOWED_INTENTS:
+            METRICS.increment("intent.fast_path")
+            return cast(Intent, intent)
+        if not self.client:
+            return None
+        cached = await self.cache.get(normalize(message))
+        return cast(Intent, cached) if cached in ALLOWED_INTENTS else None
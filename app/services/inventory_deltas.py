@@ -0,0 +1,48 @@
+"""Parsing and spooling of NDJSON inventory delta batches."""
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+
+from pydantic import ValidationError
+
+from app.domain.schemas import InventoryDelta
+from app.services.catalog_service import CatalogService, InventoryDeltaReport
+
+LOGGER = logging.getLogger(__name__)
+SPOOL_PATTERN = "*.ndjson"
+
+
+def parse_ndjson_deltas(payload: str | bytes) -> list[InventoryDelta]:
+    """Parse one delta per line, skipping blank lines."""
+    text = payload.decode("utf-8") if isinstance(payload, bytes) else payload
+    deltas: list[InventoryDelta] = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            deltas.append(InventoryDelta.model_validate(json.loads(line)))
+        except (json.JSONDecodeError, ValidationError) as exc:
+            msg = f"Invalid inventory delta on line {line_number}: {exc}"
+            raise ValueError(msg) from exc
+    return deltas
+
+
+def drain_spool(directory: Path, catalog_service: CatalogService) -> list[InventoryDeltaReport]:
+    """Apply every pending `*.ndjson` batch in name order, then mark it as processed.
+
+    Producers should write batches under a different extension and rename them
+    into place so a half-written file is never picked up.
+    """
+    reports: list[InventoryDeltaReport] = []
+    for batch in sorted(directory.glob(SPOOL_PATTERN)):
+        try:
+            deltas = parse_ndjson_deltas(batch.read_bytes())
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("Rejecting inventory batch %s: %s", batch.name, exc)
+            batch.rename(batch.with_suffix(".failed"))
+            continue
+        reports.append(catalog_service.apply_deltas(deltas))
+        batch.rename(batch.with_suffix(".done"))
+    return reports
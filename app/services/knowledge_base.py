@@ -0,0 +1,133 @@
+"""Section-level BM25 retrieval over the value-proposition markdown."""
+from __future__ import annotations
+
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.services.fast_intent import normalize
+
+LOGGER = logging.getLogger(__name__)
+BM25_K1 = 1.5
+BM25_B = 0.75
+STEM_LENGTH = 6
+STOPWORDS = frozenset(
+    (
+        "a al como con cual cuales de del el en es esta estan hay la las lo los mas me mi o para "
+        "por puedo pueden que se si son su sus te tiene tienen tu un una y"
+    ).split()
+)
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*)$")
+TOP_LEVEL_BULLET = re.compile(r"^[-*]\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap offline token estimate (~4 characters per token for Spanish prose)."""
+    return (len(text) + 3) // 4
+
+
+def _terms(text: str) -> list[str]:
+    # Dropping a plural "s" and truncating is a crude stemmer, but it maps "autos"/"auto"
+    # and "financiar"/"financiamiento" onto the same term without extra dependencies.
+    return [_stem(token) for token in normalize(text).split() if token not in STOPWORDS]
+
+
+def _stem(token: str) -> str:
+    if len(token) > 3 and token.endswith("s"):
+        token = token[:-1]
+    return token[:STEM_LENGTH]
+
+
+@dataclass(frozen=True)
+class KnowledgeSection:
+    """One retrievable chunk: a heading's lead text or one of its top-level bullets."""
+
+    heading: str
+    text: str
+    tokens: int
+
+
+class KnowledgeBase:
+    """Split markdown into sections at load time and rank them per query with BM25."""
+
+    def __init__(self, markdown: str) -> None:
+        self.sections = self._split(markdown)
+        self._term_counts = [Counter(_terms(f"{section.heading} {section.text}")) for section in self.sections]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        document_frequency: Counter[str] = Counter()
+        for counts in self._term_counts:
+            document_frequency.update(counts.keys())
+        total = len(self.sections)
+        self._idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    @classmethod
+    def from_path(cls, path: str | None, default: str) -> KnowledgeBase:
+        if path:
+            file_path = Path(path)
+            if file_path.exists():
+                return cls(file_path.read_text(encoding="utf-8"))
+            LOGGER.warning("Value proposition file not found at %s", path)
+        return cls(default)
+
+    def select(self, query: str, token_budget: int, fallback: bool = False) -> list[KnowledgeSection]:
+        """Return the best-scoring sections that fit in `token_budget`, in document order.
+
+        With `fallback`, a query matching nothing still gets the leading sections,
+        which hold the general pitch.
+        """
+        scores = self.scores(query)
+        ranked = sorted((index for index, score in enumerate(scores) if score > 0), key=lambda index: -scores[index])
+        if not ranked and fallback:
+            ranked = list(range(len(self.sections)))
+        chosen: list[int] = []
+        remaining = token_budget
+        for index in ranked:
+            if self.sections[index].tokens <= remaining:
+                chosen.append(index)
+                remaining -= self.sections[index].tokens
+        return [self.sections[index] for index in sorted(chosen)]
+
+    def scores(self, query: str) -> list[float]:
+        terms = set(_terms(query))
+        scores: list[float] = []
+        for counts, length in zip(self._term_counts, self._lengths):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self._average_length) if self._average_length else BM25_K1
+            for term in terms:
+                frequency = counts.get(term)
+                if frequency:
+                    score += self._idf[term] * frequency * (BM25_K1 + 1) / (frequency + norm)
+            scores.append(score)
+        return scores
+
+    @staticmethod
+    def _split(markdown: str) -> list[KnowledgeSection]:
+        """Cut at every heading and at every top-level bullet underneath it."""
+        sections: list[KnowledgeSection] = []
+        heading = ""
+        lines: list[str] = []
+
+        def flush() -> None:
+            text = "\n".join(lines).strip()
+            if text:
+                sections.append(KnowledgeSection(heading, text, estimate_tokens(text)))
+            lines.clear()
+
+        for line in markdown.splitlines():
+            match = HEADING_PATTERN.match(line)
+            if match:
+                flush()
+                heading = match.group(2).strip()
+                continue
+            if TOP_LEVEL_BULLET.match(line):
+                flush()
+            lines.append(line.rstrip())
+        flush()
+        return sections
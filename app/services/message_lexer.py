@@ -0,0 +1,63 @@
+"""Single-pass tokenizer for the numeric values and markers found in customer messages."""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from app.services.entity_matcher import EntityMatch
+
+# Alternatives are tried in order at each number, so "50 mil km" is a distance and
+# "4 años" a term before either can be read as a bare amount.
+TOKEN_PATTERN = re.compile(
+    r"(?P<km>\b(?P<km_head>\d{1,3})(?:\s*|,|\.)?(?P<km_tail>\d{3})?\s*(?P<km_unit>k|mil)?\s*(?:km|kil[oó]metros?))"
+    r"|(?P<term>\b(?P<term_value>\d+)\s*(?:años|anios|years))"
+    r"|(?P<amount>\b(?P<digits>\d+[\d,.]*)(?:\s*(?P<unit>k|mil))?\b)"
+    r"|(?P<down_payment>enganche|anticipo)",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class Span:
+    """A typed slice of the message: `km`, `term`, `year`, `amount` or `down_payment`."""
+
+    kind: str
+    value: float
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class ParsedMessage:
+    """Everything the slot extractors need, produced once per message."""
+
+    spans: tuple[Span, ...]
+    entities: tuple[EntityMatch, ...] = field(default=())
+
+    def values(self, kind: str) -> list[float]:
+        return [span.value for span in self.spans if span.kind == kind]
+
+    def first(self, kind: str) -> float | None:
+        return next((span.value for span in self.spans if span.kind == kind), None)
+
+
+def lex(message: str) -> tuple[Span, ...]:
+    """Tokenize `message` left to right in one regex pass."""
+    spans: list[Span] = []
+    for match in TOKEN_PATTERN.finditer(message):
+        kind = match.lastgroup
+        if kind == "km":
+            head, tail, unit = match.group("km_head", "km_tail", "km_unit")
+            value = float(f"{head}{tail}") if tail else float(head) * (1000 if unit else 1)
+        elif kind == "term":
+            value = float(match.group("term_value"))
+        elif kind == "amount":
+            digits, unit = match.group("digits", "unit")
+            value = float(digits.replace(",", "").replace(".", "")) * (1000 if unit else 1)
+            # A bare four-digit number in this range is a model year, never a price.
+            if unit is None and digits.isdigit() and 1900 <= value <= 2100:
+                kind = "year"
+        else:
+            value = 1.0
+        spans.append(Span(kind, value, match.start(), match.end()))
+    return tuple(spans)
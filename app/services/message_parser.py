@@ -1,89 +1,108 @@
 """Utilities to interpret free-form messages into structured preferences."""
 from __future__ import annotations
 
-import re
-from typing import Any
+import threading
 
 from app.domain.schemas import ChatRequest, FinancingInput
+from app.domain.turn import TurnContext
 from app.services.catalog_service import CatalogService
+from app.services.cache import TTLCache
+from app.services.entity_matcher import EntityMatch, EntityMatcher
+from app.services.message_lexer import ParsedMessage, lex
+from app.services.metrics import METRICS
 
-KM_PATTERN = re.compile(r"(\d{1,3})(?:\s*|,|\.)?(\d{3})?\s*(k|mil)?\s*(?:km|kil[oó]metros?)", re.IGNORECASE)
-YEAR_PATTERN = re.compile(r"(20\d{2})")
-AMOUNT_PATTERN = re.compile(r"\b(\d+[\d,.]*)(?:\s*(k|mil))?\b")
-YEARS_TERM_PATTERN = re.compile(r"(\d+)\s*(años|anios|years)", re.IGNORECASE)
-ENGANCHE_PATTERN = re.compile(r"enganche|anticipo", re.IGNORECASE)
-ALIAS_BRANDS = {
-    "vw": "Volkswagen",
-    "volks": "Volkswagen",
-    "chevy": "Chevrolet",
-    "bmw": "BMW",
-}
-ALIAS_MODELS = {
-    "vento": "Vento",
-    "vocho": "Sedan",
-    "cx5": "CX-5",
-}
+PARSE_CACHE_SIZE = 256
+PARSE_CACHE_TTL_SECONDS = 60
 
 
 class MessageParser:
     """Extract preferences and financing details from natural language."""
 
-    def __init__(self, catalog_service: CatalogService) -> None:
+    def __init__(self, catalog_service: CatalogService, fuzzy_threshold: float = 0.8) -> None:
         self.catalog_service = catalog_service
+        self.fuzzy_threshold = fuzzy_threshold
+        self._matcher: EntityMatcher | None = None
+        self._matcher_lock = threading.Lock()
+        # A slot answer re-enriches the same message with new preferences; reuse its parse.
+        self._parsed = TTLCache(PARSE_CACHE_SIZE, PARSE_CACHE_TTL_SECONDS)
+
+    @property
+    def matcher(self) -> EntityMatcher:
+        """Entity automaton for the current catalog, rebuilt when its version moves."""
+        matcher = self._matcher
+        version = self.catalog_service.version
+        if matcher is None or matcher.version != version:
+            with self._matcher_lock:
+                matcher = self._matcher
+                if matcher is None or matcher.version != version:
+                    matcher = EntityMatcher.from_catalog(self.catalog_service)
+                    self._matcher = matcher
+        return matcher
 
     def enrich_request(self, request: ChatRequest) -> ChatRequest:
-        data = request.model_dump()
-        preferences: dict[str, Any] = dict(data.get("preferences") or {})
-
+        """Return a copy of `request` with parsed preferences; the chat pipeline uses `enrich`."""
+        turn = TurnContext.from_request(request)
+        self.enrich(turn)
+        return turn.to_request()
+
+    def enrich(self, turn: TurnContext) -> TurnContext:
+        """Fill preferences and financing the message implies, in place."""
+        preferences = turn.preferences
+        parsed = self.parse(turn.message)
+        entities = list(parsed.entities)
         if not preferences.get("make"):
-            maybe_make = self._extract_make(request.message)
+            maybe_make = self._extract_make(entities)
             if maybe_make:
-                preferences["make"] = maybe_make
+                preferences["make"] = maybe_make.value
+                self._count_fuzzy(maybe_make)
 
         if not preferences.get("model"):
-            maybe_model = self._extract_model(request.message, preferences.get("make"))
+            maybe_model = self._extract_model(entities, preferences.get("make"))
             if maybe_model:
-                preferences["model"] = maybe_model
-                if not preferences.get("make"):
-                    derived_make = self.catalog_service.find_make_by_model(maybe_model)
-                    if derived_make:
-                        preferences["make"] = derived_make
+                preferences["model"] = maybe_model.value
+                self._count_fuzzy(maybe_model)
+                if not preferences.get("make") and maybe_model.makes:
+                    preferences["make"] = maybe_model.makes[0]
 
         if "max_km" not in preferences:
-            km = self._extract_kilometers(request.message)
+            km = self._extract_kilometers(parsed)
             if km:
                 preferences["max_km"] = km
 
         if "min_year" not in preferences:
-            year = self._extract_year(request.message)
+            year = self._extract_year(parsed)
             if year:
                 preferences["min_year"] = year
 
         if "max_price" not in preferences:
-            price = self._extract_price_hint(request.message)
+            price = self._extract_price_hint(parsed)
             if price:
                 preferences["max_price"] = price
 
-        data["preferences"] = preferences or None
+        if not turn.financing:
+            turn.financing = self._extract_financing(parsed)
 
-        if not data.get("financing"):
-            financing = self._extract_financing(request.message)
-            if financing:
-                data["financing"] = financing.model_dump()
+        return turn
 
-        return ChatRequest(**data)
+    def parse(self, message: str) -> ParsedMessage:
+        """Lex `message` once and find its entities, cached per catalog version."""
+        matcher = self.matcher
+        key = f"{matcher.version}\0{message}"
+        parsed = self._parsed.get(key)
+        if parsed is None:
+            parsed = ParsedMessage(lex(message), tuple(self._find_entities(message)))
+            self._parsed.set(key, parsed)
+        return parsed
 
     def detect_intent(self, message: str) -> str:
         # Deprecated: intent classification now handled by IntentClassifier
         _ = message
         return "ambiguous"
 
-    def identify_missing_fields(
-        self, original: ChatRequest, enriched: ChatRequest
-    ) -> list[str]:
+    def identify_missing_fields(self, turn: TurnContext) -> list[str]:
         """Highlight key fields still missing after parsing."""
         missing: list[str] = []
-        prefs = enriched.preferences or {}
+        prefs = turn.preferences
 
         if not prefs.get("make"):
             missing.append("marca")
@@ -91,13 +110,13 @@ class MessageParser:
             missing.append("modelo")
         if not prefs.get("max_km"):
             missing.append("kilometraje objetivo")
-        if not prefs.get("max_price"):
+        if not prefs.get("max_price") and not prefs.get("max_monthly_payment"):
             missing.append("presupuesto")
         if not prefs.get("min_year"):
             missing.append("año mínimo")
 
-        if original.financing is None:
-            financing = enriched.financing
+        if not turn.financing_provided:
+            financing = turn.financing
             if not financing:
                 missing.append("datos de financiamiento (precio y plazos)")
             else:
@@ -108,91 +127,69 @@ class MessageParser:
 
         return missing
 
-    def _extract_make(self, message: str) -> str | None:
-        text = message.lower()
-        for make in self.catalog_service.list_makes():
-            if make.lower() in text:
-                return make
-        for alias, canonical in ALIAS_BRANDS.items():
-            if alias in text:
-                return canonical
-        return None
+    def _find_entities(self, message: str) -> list[EntityMatch]:
+        """Exact mentions first; typo-tolerant lookup only for the kinds still missing."""
+        matcher = self.matcher
+        entities = matcher.find(message)
+        found = {match.kind for match in entities}
+        if len(found) < 2:
+            spans = [(match.start, match.end) for match in entities]
+            fuzzy = matcher.fuzzy.resolve(message, self.fuzzy_threshold, skip=spans)
+            entities.extend(match for match in fuzzy if match.kind not in found)
+        return entities
 
-    def _extract_model(self, message: str, make: str | None) -> str | None:
-        candidates = (
-            self.catalog_service.list_models(make) if make else self.catalog_service.list_models()
-        )
-        text = message.lower()
-        for model in candidates:
-            model_clean = model.lower()
-            if len(model_clean) < 3:
-                continue
-            if model_clean in text:
-                return model
-        for alias, canonical in ALIAS_MODELS.items():
-            if alias in text:
-                return canonical
-        return None
+    @staticmethod
+    def _count_fuzzy(match: EntityMatch) -> None:
+        if match.confidence < 1:
+            METRICS.increment(f"parser.fuzzy_{match.kind}")
 
     @staticmethod
-    def _extract_kilometers(message: str) -> int | None:
-        match = KM_PATTERN.search(message)
-        if not match:
-            return None
-        groups = match.groups()
-        number = 0
-        if groups[1]:
-            number = int(f"{groups[0]}{groups[1]}")
-        else:
-            number = int(groups[0])
-            if groups[2]:
-                number *= 1000
-        return number
+    def _extract_make(entities: list[EntityMatch]) -> EntityMatch | None:
+        # Exact catalog spellings win over aliases, and both over approximate matches.
+        makes = [match for match in entities if match.kind == "make"]
+        makes.sort(key=lambda match: (-match.confidence, match.alias))
+        return makes[0] if makes else None
 
     @staticmethod
-    def _extract_year(message: str) -> int | None:
-        years = [int(value) for value in YEAR_PATTERN.findall(message)
-                 if 2000 <= int(value) <= 2030]
+    def _extract_model(entities: list[EntityMatch], make: str | None) -> EntityMatch | None:
+        needle = make.lower() if make else None
+        models = [
+            match
+            for match in entities
+            if match.kind == "model"
+            and (match.alias or needle is None or any(owner.lower() == needle for owner in match.makes))
+        ]
+        models.sort(key=lambda match: (-match.confidence, match.alias))
+        return models[0] if models else None
+
+    @staticmethod
+    def _extract_kilometers(parsed: ParsedMessage) -> int | None:
+        km = parsed.first("km")
+        return int(km) if km else None
+
+    @staticmethod
+    def _extract_year(parsed: ParsedMessage) -> int | None:
+        years = [int(year) for year in parsed.values("year") if 2000 <= year <= 2030]
         if not years:
             return None
         return min(years)
 
     @staticmethod
-    def _parse_amount(token: str, multiplier: str | None) -> float:
-        normalized = token.replace(",", "").replace(".", "")
-        value = float(normalized)
-        if multiplier:
-            multiplier = multiplier.lower()
-            if multiplier in {"k", "mil"}:
-                value *= 1000
-        return value
-
-    def _extract_price_hint(self, message: str) -> float | None:
-        for match in AMOUNT_PATTERN.finditer(message):
-            token, multiplier = match.groups()
-            amount = self._parse_amount(token, multiplier)
-            if 1900 <= amount <= 2100:
-                continue  # probable year
+    def _extract_price_hint(parsed: ParsedMessage) -> float | None:
+        for amount in parsed.values("amount"):
             if amount > 50000:  # assume MXN
                 return amount
         return None
 
-    def _extract_financing(self, message: str) -> FinancingInput | None:
-        amounts = []
-        for match in AMOUNT_PATTERN.finditer(message):
-            token, multiplier = match.groups()
-            amount = self._parse_amount(token, multiplier)
-            if 1900 <= amount <= 2100:
-                continue
-            if amount > 10000:
-                amounts.append(amount)
-
+    @staticmethod
+    def _extract_financing(parsed: ParsedMessage) -> FinancingInput | None:
+        amounts = [amount for amount in parsed.values("amount") if amount > 10000]
         if not amounts:
             return None
 
-        years_match = YEARS_TERM_PATTERN.search(message)
-        years = int(years_match.group(1)) if years_match else None
-        enganche_match = ENGANCHE_PATTERN.search(message)
+        term = parsed.first("term")
+        years = int(term) if term else None
+        enganche_match = parsed.first("down_payment")
 
         price = amounts[0]
         down_payment = None
@@ -0,0 +1,65 @@
+"""Process-wide counters and timings exposed through the admin API."""
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any
+
+# Set by each HTTP handler so deeper layers can break their counters down per endpoint.
+CURRENT_ENDPOINT: ContextVar[str | None] = ContextVar("current_endpoint", default=None)
+# Per-turn figures (e.g. prompt token counts) collected for the turn's log event.
+TURN_STATS: ContextVar[dict[str, float] | None] = ContextVar("turn_stats", default=None)
+
+
+class Metrics:
+    """Thread-safe counters; timings are kept as `<name>.count` and `<name>.total_ms`."""
+
+    def __init__(self) -> None:
+        self._values: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._values[name] += value
+
+    def observe(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self._values[f"{name}.count"] += 1
+            self._values[f"{name}.total_ms"] += elapsed_ms
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return dict(sorted(self._values.items()))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+METRICS = Metrics()
+
+
+def start_turn() -> dict[str, float]:
+    """Begin collecting per-turn stats; tasks spawned afterwards share the same dict."""
+    stats: dict[str, float] = {}
+    TURN_STATS.set(stats)
+    return stats
+
+
+def record_turn(name: str, value: float) -> None:
+    """Add `value` to the current turn's stat and to the process-wide total."""
+    METRICS.increment(name, value)
+    stats = TURN_STATS.get()
+    if stats is not None:
+        stats[name] = stats.get(name, 0) + value
+
+
+def record_usage(prefix: str, usage: Any) -> None:
+    """Record prompt, cached-prefix and completion token counts from an OpenAI `usage` object."""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    record_turn(f"{prefix}.prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+    record_turn(f"{prefix}.cached_tokens", getattr(details, "cached_tokens", 0) or 0)
+    record_turn(f"{prefix}.completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
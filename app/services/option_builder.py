@@ -5,13 +5,13 @@ from app.services.catalog_service import CatalogService
 
 
 class OptionBuilder:
+    """Offer the makes and models with the most units in stock first."""
+
     def __init__(self, catalog: CatalogService) -> None:
         self.catalog = catalog
 
     def make_options(self, limit: int = 5) -> list[str]:
-        makes = sorted(self.catalog.list_makes())
-        return makes[:limit] if limit else makes
+        return self.catalog.facets().top_makes(limit)
 
     def model_options(self, make: str, limit: int = 5) -> list[str]:
-        models = sorted(self.catalog.list_models(make))
-        return models[:limit] if limit else models
+        return self.catalog.facets().top_models(make, limit)
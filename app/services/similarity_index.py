@@ -0,0 +1,150 @@
+"""Vectorized nearest-neighbour search over normalized car features."""
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+from app.services.catalog_store import CatalogStore, code_mask, mask_lookup
+
+FEATURES = ("price", "km", "year", "length_mm", "width_mm", "height_mm")
+DIMENSION_FEATURES = ("length_mm", "width_mm", "height_mm")
+DEFAULT_WEIGHTS = {
+    "price": 1.0,
+    "km": 0.5,
+    "year": 0.5,
+    "length_mm": 0.35,
+    "width_mm": 0.35,
+    "height_mm": 0.35,
+}
+# Preferences that are limits rather than targets: only overshooting them costs distance.
+ONE_SIDED = {"km": "max", "year": "min"}
+MAKE_MISMATCH_PENALTY = 1.0
+REFERENCE_SAMPLE = 512
+MODEL_MISMATCH_PENALTY = 0.5
+
+
+class SimilarityIndex:
+    """Feature matrix of z-scored numeric attributes answering k-NN queries.
+
+    Each feature is kept as its own contiguous float32 row so a query only touches
+    the features it actually specifies. Missing body dimensions (stored as 0) are
+    imputed with the mean, i.e. they neither help nor hurt a candidate.
+    """
+
+    def __init__(self, store: CatalogStore) -> None:
+        self.store = store
+        rows = store.live_rows()
+        self._means = np.zeros(len(FEATURES), dtype=np.float64)
+        self._scales = np.ones(len(FEATURES), dtype=np.float64)
+        for position, name in enumerate(FEATURES):
+            values = store.column(name)[rows].astype(np.float64)
+            if name in DIMENSION_FEATURES:
+                values = values[values > 0]
+            if len(values):
+                self._means[position] = values.mean()
+                self._scales[position] = values.std() or 1.0
+        self._matrix = np.zeros((len(FEATURES), len(store.alive)), dtype=np.float32)
+        for position in range(len(FEATURES)):
+            self._matrix[position, : len(store)] = self._normalize(position, store.column(FEATURES[position]))
+
+    def update(self, row: int) -> None:
+        """Refresh one row after an incremental change (normalization stats stay fixed)."""
+        if row >= self._matrix.shape[1]:
+            grown = np.zeros((len(FEATURES), len(self.store.alive)), dtype=np.float32)
+            grown[:, : self._matrix.shape[1]] = self._matrix
+            self._matrix = grown
+        for position, name in enumerate(FEATURES):
+            value = np.asarray([self.store.columns[name][row]])
+            self._matrix[position, row] = self._normalize(position, value)[0]
+
+    def nearest(
+        self,
+        target: dict[str, float],
+        limit: int,
+        make_codes: Any = None,
+        model_codes: Any = None,
+        rows: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Return the `limit` live rows closest to `target`, nearest first.
+
+        Rows outside `make_codes`/`model_codes` are penalized rather than excluded,
+        so a close match from another brand can still surface. `rows` restricts the
+        scan to a candidate subset; by default every row is considered.
+        """
+        distances = self.distances(rows, target, make_codes, model_codes)
+        if rows is None:
+            rows = np.arange(len(distances), dtype=np.int64)
+        if not len(rows) or limit <= 0:
+            return np.empty(0, dtype=np.int64)
+        live = min(limit, int(np.isfinite(distances).sum()))
+        if not live:
+            return np.empty(0, dtype=np.int64)
+        nearest = np.argpartition(distances, live - 1)[:live]
+        return rows[nearest[np.lexsort((rows[nearest], distances[nearest]))]]
+
+    def distances(
+        self,
+        rows: np.ndarray | None,
+        target: dict[str, float],
+        make_codes: Any = None,
+        model_codes: Any = None,
+    ) -> np.ndarray:
+        """Weighted squared distance from `target` per row (all rows when `rows` is None).
+
+        Deleted rows get an infinite distance. A full scan covers the rows present
+        when it starts; rows appended meanwhile are left for the next query.
+        """
+        matrix = self._matrix
+        full_scan = rows is None
+        if rows is None:
+            rows = slice(0, min(len(self.store), matrix.shape[1]))
+        distances = np.zeros(rows.stop if full_scan else len(rows), dtype=np.float32)
+        for position, name in enumerate(FEATURES):
+            if name not in target or not DEFAULT_WEIGHTS.get(name):
+                continue
+            query = self._normalize(position, np.asarray([target[name]], dtype=np.float64))[0]
+            features = matrix[position, rows]
+            delta = features - np.float32(query)
+            if ONE_SIDED.get(name) == "max":
+                np.maximum(delta, 0, out=delta)
+            elif ONE_SIDED.get(name) == "min":
+                np.minimum(delta, 0, out=delta)
+            np.multiply(delta, delta, out=delta)
+            delta *= np.float32(DEFAULT_WEIGHTS[name])
+            distances += delta
+
+        columns = self.store.columns
+        if make_codes is not None and len(make_codes):
+            mismatch = ~mask_lookup(code_mask(make_codes, len(self.store.makes)), columns["make"][rows])
+            distances[mismatch] += MAKE_MISMATCH_PENALTY
+        if model_codes is not None and len(model_codes):
+            mismatch = ~mask_lookup(code_mask(model_codes, len(self.store.models)), columns["model"][rows])
+            distances[mismatch] += MODEL_MISMATCH_PENALTY
+        distances[~self.store.alive[rows]] = np.inf
+        return distances
+
+    def price_radius(self, distance: float) -> float:
+        """Largest price gap a row can have and still be within `distance`.
+
+        Every term of the distance is non-negative, so the price term alone bounds it.
+        """
+        position = FEATURES.index("price")
+        return float(np.sqrt(max(distance, 0.0) / DEFAULT_WEIGHTS["price"]) * self._scales[position])
+
+    def reference_dimensions(self, rows: np.ndarray) -> dict[str, float]:
+        """Median known body dimensions of the given rows, e.g. of a requested model."""
+        reference: dict[str, float] = {}
+        rows = rows[:REFERENCE_SAMPLE]
+        for name in DIMENSION_FEATURES:
+            values = self.store.columns[name][rows]
+            values = values[values > 0]
+            if len(values):
+                reference[name] = float(np.median(values))
+        return reference
+
+    def _normalize(self, position: int, values: np.ndarray) -> np.ndarray:
+        values = values.astype(np.float64)
+        if FEATURES[position] in DIMENSION_FEATURES:
+            values = np.where(values > 0, values, self._means[position])
+        return ((values - self._means[position]) / self._scales[position]).astype(np.float32)
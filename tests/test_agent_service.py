@@ -0,0 +1,150 @@
+"""Tests for the LLM client and the commercial agent's prompts and context."""
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+from typing import AsyncIterator, Iterable
+
+from app.config import Settings
+from app.domain.schemas import FinancingInput
+from app.domain.turn import TurnContext
+from app.services.agent_service import (
+    UNAVAILABLE_MESSAGE,
+    CatalogContext,
+    CommercialAgentService,
+    LLMClient,
+)
+from app.services.cache import TieredCache
+from app.services.catalog_service import CatalogService
+from app.services.metrics import start_turn
+
+_SAMPLE_CSV = """stock_id,km,price,make,model,year,version,bluetooth,largo,ancho,altura,car_play
+123,10000,250000.0,Toyota,Corolla,2019,XLE,Sí,4630,1780,1435,Sí
+456,45000,180000.0,Nissan,Sentra,2017,Advance,,4615,1760,1500,
+"""
+
+
+class _FakeCompletions:
+    """Stand-in for `AsyncOpenAI().chat.completions` replaying scripted replies.
+
+    Plain calls return the next reply; streaming calls yield every reply as one
+    delta each. Keyword arguments of each call are kept in `calls`.
+    """
+
+    def __init__(self, replies: Iterable[str | None], usage: SimpleNamespace | None = None) -> None:
+        self.replies = list(replies)
+        self.usage = usage
+        self.calls: list[dict] = []
+
+    async def create(self, **kwargs: object) -> object:
+        self.calls.append(kwargs)
+        if kwargs.get("stream"):
+            return self._chunks()
+        message = SimpleNamespace(content=self.replies[len(self.calls) - 1])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=self.usage)
+
+    async def _chunks(self) -> AsyncIterator[SimpleNamespace]:
+        for text in self.replies:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def _fake(client: LLMClient, replies: Iterable[str | None], usage: SimpleNamespace | None = None) -> _FakeCompletions:
+    completions = _FakeCompletions(replies, usage)
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return completions
+
+
+def _catalog(tmp_path: Path, rows: int = 2) -> CatalogService:
+    csv_path = tmp_path / "catalog.csv"
+    csv_path.write_text("\n".join(_SAMPLE_CSV.splitlines()[: rows + 1]) + "\n", encoding="utf-8")
+    catalog = CatalogService()
+    catalog.load_catalog(str(csv_path))
+    return catalog
+
+
+def test_reply_cache_reuses_replies_within_a_catalog_version() -> None:
+    client = LLMClient("sk-test", "gpt-4o-mini", cache=TieredCache("reply", "v1", max_entries=8, ttl_seconds=60))
+    completions = _fake(client, ["respuesta 1", "respuesta 2"])
+
+    async def scenario() -> list[str]:
+        return [
+            await client.generate("system", "¿qué marcas tienen?", cache_scope="catalog-v1"),
+            await client.generate("system", "¿qué marcas tienen?", cache_scope="catalog-v1"),
+            await client.generate("system", "¿qué marcas tienen?", cache_scope="catalog-v2"),
+        ]
+
+    assert asyncio.run(scenario()) == ["respuesta 1", "respuesta 1", "respuesta 2"]
+    assert len(completions.calls) == 2
+
+
+def test_single_call_mode_returns_intent_and_reply_together(tmp_path: Path) -> None:
+    agent = CommercialAgentService(_catalog(tmp_path, rows=1), Settings(openai_api_key="sk-test"))
+    completions = _fake(
+        agent.llm_client, ['{"intent": "greeting", "reply": "¡Hola! ¿En qué te ayudo?"}', '{"intent": "nonsense"}']
+    )
+    request = TurnContext(user_id="u1", message="hola", preferences={"make": "Toyota"})
+
+    response, intent = asyncio.run(agent.answer_with_intent(request))
+    assert intent == "greeting"
+    assert response.message.startswith("¡Hola!")
+    assert response.recommendations == []
+    assert completions.calls[0]["response_format"] == {"type": "json_object"}
+
+    response, intent = asyncio.run(agent.answer_with_intent(request))
+    assert intent == "ambiguous"
+    assert response.message == UNAVAILABLE_MESSAGE
+
+
+def test_monthly_budget_filter_and_quotes_share_the_down_payment(tmp_path: Path) -> None:
+    agent = CommercialAgentService(_catalog(tmp_path), Settings(openai_api_key=None))
+    request = TurnContext(
+        user_id="u1",
+        message="cuánto pagaría",
+        preferences={"max_monthly_payment": 4000},
+        financing=FinancingInput(car_price=250000, down_payment=60000, years=6),
+    )
+
+    context = agent._build_context(request)
+    assert sorted(item.car.stock_id for item in context.recommendations) == ["123", "456"]
+    for item in context.recommendations:
+        assert min(option.monthly_payment for option in item.payment_options) <= 4000
+
+
+def test_answer_stream_sends_structured_context_before_tokens() -> None:
+    agent = CommercialAgentService(CatalogService(), Settings(openai_api_key="sk-test"))
+    completions = _fake(agent.llm_client, ["Te ", "recomiendo ", None, "el Corolla."])
+    request = TurnContext(user_id="u1", message="busco un sedán")
+    context = CatalogContext(recommendations=[], used_fallback=False, financing_plan=None)
+
+    async def collect() -> list[dict]:
+        return [event async for event in agent.answer_stream(request, context, intent="recommendation")]
+
+    events = asyncio.run(collect())
+    assert completions.calls[0]["stream"] is True
+    assert [event["type"] for event in events] == ["context", "token", "token", "token", "done"]
+    assert events[0]["recommendations"] == [] and events[0]["intent"] == "recommendation"
+    assert events[-1]["message"] == "Te recomiendo el Corolla."
+
+
+def test_prompts_share_a_static_prefix_and_report_cached_tokens() -> None:
+    agent = CommercialAgentService(CatalogService(), Settings(openai_api_key="sk-test"))
+    first_system, first_user = agent._build_prompts("hola", [], None, [], False, "greeting", None)
+    second_system, second_user = agent._build_prompts("¿tienen garantía?", [], None, ["budget"], False, "faq", None)
+    assert first_system == second_system
+    assert first_user.endswith("Mensaje del cliente: hola")
+    assert second_user.endswith("Mensaje del cliente: ¿tienen garantía?")
+
+    usage = SimpleNamespace(
+        prompt_tokens=1200,
+        completion_tokens=40,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=1024),
+    )
+    _fake(agent.llm_client, ["ok"], usage)
+
+    async def scenario() -> dict[str, float]:
+        stats = start_turn()
+        await agent.llm_client.generate(first_system, first_user)
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["llm.prompt_tokens"] == 1200
+    assert stats["llm.cached_tokens"] == 1024
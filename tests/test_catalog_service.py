@@ -1,7 +1,12 @@
 """Unit tests for CatalogService."""
+import threading
 from pathlib import Path
 
+import numpy as np
+
+from app.domain.schemas import InventoryDelta
 from app.services.catalog_service import CatalogService
+from app.services.option_builder import OptionBuilder
 
 _SAMPLE_CSV = """stock_id,km,price,make,model,year,version,bluetooth,largo,ancho,altura,car_play
 123,10000,250000.0,Toyota,Corolla,2019,XLE,Sí,4630,1780,1435,Sí
@@ -36,3 +41,260 @@ def test_search_cars_filters_by_preferences(tmp_path: Path) -> None:
 
     none_match = service.search_cars({"min_year": 2021})
     assert none_match == []
+
+
+def test_search_cars_index_matches_full_scan() -> None:
+    service = CatalogService()
+    service.load_catalog(str(Path(__file__).resolve().parents[1] / "app" / "data" / "catalog.csv"))
+    everything = service.search_cars()
+
+    scenarios = [
+        {"make": "volks"},
+        {"make": "Toyota", "max_km": 80000},
+        {"model": "a", "max_price": 400000, "min_year": 2018},
+        {"max_price": 300000, "max_km": 60000},
+        {"make": "nissan", "model": "versa", "min_year": 2015},
+    ]
+    for prefs in scenarios:
+        expected = [
+            car
+            for car in everything
+            if (not prefs.get("make") or prefs["make"].lower() in car.make.lower())
+            and (not prefs.get("model") or prefs["model"].lower() in car.model.lower())
+            and ("max_price" not in prefs or car.price <= prefs["max_price"])
+            and ("max_km" not in prefs or car.km <= prefs["max_km"])
+            and ("min_year" not in prefs or car.year >= prefs["min_year"])
+        ]
+        assert service.search_cars(prefs) == expected
+
+
+def test_columnar_catalog_lists_vocabulary_and_limits_results(tmp_path: Path) -> None:
+    service = CatalogService()
+    service.load_catalog(_write_csv(tmp_path))
+
+    assert service.list_makes() == {"Toyota", "Nissan"}
+    assert service.list_models("toyota") == {"Corolla"}
+    assert service.find_make_by_model("sentra") == "Nissan"
+    assert [car.stock_id for car in service.search_cars(limit=1)] == ["123"]
+
+
+def test_load_catalog_reuses_snapshot(tmp_path: Path) -> None:
+    csv_path = _write_csv(tmp_path)
+    snapshot_dir = tmp_path / "snapshots"
+
+    first = CatalogService(snapshot_dir=str(snapshot_dir)).load_catalog(csv_path)
+    service = CatalogService(snapshot_dir=str(snapshot_dir))
+    second = service.load_catalog(csv_path)
+
+    assert first.source == "csv"
+    assert second.source == "snapshot"
+    assert second.rows == 2
+    assert service.search_cars({"make": "nissan"})[0].stock_id == "456"
+    assert service.search_cars()[0].bluetooth is True
+
+
+def test_reload_swaps_catalog_and_reports_changes(tmp_path: Path) -> None:
+    csv_path = _write_csv(tmp_path)
+    service = CatalogService()
+    service.load_catalog(csv_path)
+
+    Path(csv_path).write_text(
+        _SAMPLE_CSV.replace("250000.0", "240000.0").replace("456,45000", "789,45000"),
+        encoding="utf-8",
+    )
+    report = service.load_catalog(csv_path)
+
+    assert report.version == 2 == service.version
+    assert report.added == ["789"]
+    assert report.removed == ["456"]
+    assert report.changed == ["123"]
+    assert service.search_cars({"make": "toyota"})[0].price == 240000.0
+
+
+def test_apply_deltas_updates_catalog_in_place(tmp_path: Path) -> None:
+    service = CatalogService()
+    service.load_catalog(_write_csv(tmp_path))
+
+    report = service.apply_deltas(
+        [
+            InventoryDelta(op="update", stock_id="123", price=150000.0),
+            InventoryDelta(op="delete", stock_id="456"),
+            InventoryDelta(
+                op="upsert", stock_id="789", make="Mazda", model="CX-5", year=2021, km=12000, price=420000.0
+            ),
+            InventoryDelta(op="delete", stock_id="missing"),
+        ]
+    )
+
+    assert (report.updated, report.deleted, report.upserted) == (1, 1, 1)
+    assert report.missing == ["missing"]
+    assert report.version == service.version == 2
+    assert service.list_makes() == {"Toyota", "Mazda"}
+    assert [car.stock_id for car in service.search_cars({"max_price": 200000})] == ["123"]
+    assert [car.stock_id for car in service.search_cars({"min_year": 2020})] == ["789"]
+    assert service.find_make_by_model("cx-5") == "Mazda"
+    assert service.search_cars({"make": "nissan"}) == []
+
+
+def test_rank_cars_returns_top_k_by_key(tmp_path: Path) -> None:
+    service = CatalogService()
+    service.load_catalog(_write_csv(tmp_path))
+
+    assert [car.stock_id for car in service.rank_cars(limit=1, key="price")] == ["456"]
+    assert [car.stock_id for car in service.rank_cars(limit=1, key="year")] == ["123"]
+    assert [car.stock_id for car in service.rank_cars({"max_price": 200000}, key="km")] == ["456"]
+    assert [car.stock_id for car in service.suggest_alternatives({"max_price": 240000}, limit=1)] == ["123"]
+
+
+def test_suggest_alternatives_matches_full_similarity_scan() -> None:
+    service = CatalogService()
+    service.load_catalog(str(Path(__file__).resolve().parents[1] / "app" / "data" / "catalog.csv"))
+    index = service._index
+
+    scenarios = [
+        ({"price": 250000.0, "km": 40000.0}, "Toyota"),
+        ({"price": 180000.0, "year": 2019.0}, None),
+        ({"price": 900000.0}, "Mazda"),
+    ]
+    for target, make in scenarios:
+        make_codes = index.make_codes(make) if make else None
+        pruned = index.nearest(target, 5, make_codes)
+        assert pruned.tolist() == index.similarity.nearest(target, 5, make_codes).tolist()
+
+    nearby = service.suggest_alternatives({"make": "Toyota", "max_price": 250000}, limit=3)
+    assert len(nearby) == 3
+    assert nearby[0].make == "Toyota"
+
+
+def test_facets_rank_options_by_stock_and_follow_deltas(tmp_path: Path) -> None:
+    service = CatalogService()
+    service.load_catalog(_write_csv(tmp_path))
+    service.apply_deltas(
+        InventoryDelta(op="upsert", stock_id=stock_id, price=price, make="Nissan", model="Versa", year=2021)
+        for stock_id, price in (("900", 210000.0), ("901", 205000.0))
+    )
+    options = OptionBuilder(service)
+
+    facets = service.facets()
+    assert facets.version == service.version
+    assert facets.makes == [("Nissan", 3), ("Toyota", 1)]
+    assert options.make_options() == ["Nissan", "Toyota"]
+    assert options.model_options("nissan") == ["Versa", "Sentra"]
+    assert facets.years == [(2017, 1), (2019, 1), (2021, 2)]
+    assert facets.price_buckets == [(150000, 200000, 1), (200000, 250000, 2), (250000, 300000, 1)]
+    assert service.facets() is facets
+
+    service.apply_deltas([InventoryDelta(op="delete", stock_id="123")])
+    assert service.facets().makes == [("Nissan", 3)]
+    assert options.make_options() == ["Nissan"]
+
+
+def test_max_monthly_payment_filters_through_the_price_index(tmp_path: Path) -> None:
+    service = CatalogService()
+    service.load_catalog(_write_csv(tmp_path))
+
+    # 180k fits 4,000/month on the longest term; 250k does not unless 60k goes down.
+    assert [car.stock_id for car in service.search_cars({"max_monthly_payment": 4000})] == ["456"]
+    assert len(service.search_cars({"max_monthly_payment": 4000, "down_payment": 60000})) == 2
+    assert service.search_cars({"max_monthly_payment": 4000, "max_price": 150000}) == []
+
+
+def test_relevance_walk_matches_full_scoring(tmp_path: Path) -> None:
+    lines = [_SAMPLE_CSV.splitlines()[0]]
+    for stock_id in range(3000):
+        km, price, year = (stock_id * 7919) % 150000, 90000 + (stock_id * 104729) % 700000, 2008 + stock_id % 16
+        make, model = ("Toyota", "Corolla") if stock_id % 3 else ("Mazda", "CX-5")
+        lines.append(f"{stock_id},{km},{price}.0,{make},{model},{year},Base,,,,,")
+    csv_path = tmp_path / "catalog.csv"
+    csv_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    service = CatalogService()
+    service.load_catalog(str(csv_path))
+    service.apply_deltas(
+        [
+            InventoryDelta(op="update", stock_id="17", km=5, price=95000.0, year=2023),
+            InventoryDelta(op="delete", stock_id="42"),
+        ]
+    )
+    index = service._index
+
+    for prefs in ({}, {"max_price": 300000}, {"make": "toyota", "max_km": 90000}, {"min_year": 2020}):
+        rows = index.query(prefs)
+        scores = index._score(rows, "relevance", prefs.get("max_price"))
+        expected = rows[np.lexsort((rows, scores))[:5]]
+        assert index.top_k(prefs, 5).tolist() == expected.tolist()
+    assert 17 in index.top_k({}, 5).tolist()
+
+
+def test_upserted_unit_leaves_omitted_fields_empty(tmp_path: Path) -> None:
+    service = CatalogService()
+    service.load_catalog(_write_csv(tmp_path))
+    service.apply_deltas([InventoryDelta(op="upsert", stock_id="789", make="Mazda", model="CX-5", price=420000.0)])
+
+    car = service.search_cars({"make": "mazda"})[0]
+    assert car.version == ""
+    assert car.bluetooth is None and car.car_play is None
+
+
+def test_vocabulary_reads_survive_concurrent_deltas(tmp_path: Path) -> None:
+    service = CatalogService()
+    service.load_catalog(_write_csv(tmp_path))
+    deltas = [
+        InventoryDelta(op="upsert", stock_id=f"n{number}", make=f"Make {number}", model=f"Model {number}")
+        for number in range(3000)
+    ]
+    writer = threading.Thread(target=service.apply_deltas, args=(deltas,))
+    writer.start()
+    while writer.is_alive():
+        service.list_makes()
+        service.list_models("toyota")
+        service.find_make_by_model("model 1")
+    writer.join()
+
+    assert len(service.list_makes()) == 3002
+
+
+def test_queries_survive_concurrent_deltas(tmp_path: Path) -> None:
+    service = CatalogService()
+    service.load_catalog(_write_csv(tmp_path))
+    deltas = [
+        InventoryDelta(
+            op="upsert",
+            stock_id=f"n{number}",
+            make=f"Make {number % 50}",
+            model=f"Model {number}",
+            year=2015 + number % 8,
+            km=number * 3,
+            price=100000.0 + number * 17,
+        )
+        for number in range(6000)
+    ]
+
+    def write() -> None:
+        for start in range(0, len(deltas), 50):
+            service.apply_deltas(deltas[start : start + 50])
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    while writer.is_alive():
+        service.search_cars({"model": "model 1", "max_km": 50000}, limit=5)
+        service.rank_cars({"make": "make 3"})
+        service.suggest_alternatives({"make": "make 7", "max_price": 200000})
+        service.suggest_alternatives({"min_year": 2020})
+    writer.join()
+
+    assert len(service) == 6002
+
+
+def test_facets_do_not_wait_for_the_write_lock(tmp_path: Path) -> None:
+    service = CatalogService()
+    service.load_catalog(_write_csv(tmp_path))
+    service.apply_deltas([InventoryDelta(op="upsert", stock_id="789", make="Mazda", model="CX-5", price=420000.0)])
+
+    built: list = []
+    # Stands in for a reload or a large delta batch holding the lock.
+    with service._write_lock:
+        reader = threading.Thread(target=lambda: built.append(service.facets()))
+        reader.start()
+        reader.join(timeout=2)
+        assert [facets.makes for facets in built] == [[("Mazda", 1), ("Nissan", 1), ("Toyota", 1)]]
+    assert service.facets() is built[0]
@@ -0,0 +1,42 @@
+"""Tests for the batch chat runner."""
+import asyncio
+import json
+
+from fastapi import HTTPException
+
+import app.main as main
+from app.domain.schemas import ChatRequest, ChatResponse
+
+
+def test_batch_keeps_per_user_order_and_bounds_concurrency(monkeypatch) -> None:
+    seen: list[str] = []
+    active = peak = 0
+
+    async def fake_handle_chat(payload: ChatRequest) -> ChatResponse:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        seen.append(payload.message)
+        # Earlier turns take longer, so only per-user sequencing keeps them ordered.
+        await asyncio.sleep(0.01 if payload.message.endswith("1") else 0)
+        active -= 1
+        if payload.message == "b2":
+            raise HTTPException(status_code=400, detail="bad turn")
+        return ChatResponse(message=f"ok {payload.message}")
+
+    monkeypatch.setattr(main, "_handle_chat", fake_handle_chat)
+    payloads = [
+        ChatRequest(user_id=user, message=f"{user}{turn}") for turn in (1, 2, 3) for user in ("a", "b", "c")
+    ]
+
+    async def collect() -> list[dict]:
+        return [json.loads(line) async for line in main._run_batch(payloads, concurrency=2)]
+
+    results = asyncio.run(collect())
+    assert peak <= 2
+    assert sorted(result["index"] for result in results) == list(range(len(payloads)))
+    for user in ("a", "b", "c"):
+        assert [message for message in seen if message.startswith(user)] == [f"{user}1", f"{user}2", f"{user}3"]
+    failed = [result for result in results if result["status"] != 200]
+    assert failed == [{"index": 4, "user_id": "b", "status": 400, "detail": "bad turn"}]
+    assert results[0]["response"]["message"].startswith("ok ")
@@ -0,0 +1,64 @@
+"""Tests for the background tasks a chat turn starts and must clean up."""
+import asyncio
+
+import pytest
+
+import app.main as main
+from app.domain.schemas import ChatRequest
+from app.services.conversation_store import ConversationSession
+
+
+def _pending(started: list[asyncio.Task]):
+    async def wait_forever(*_: object) -> None:
+        started.append(asyncio.current_task())
+        await asyncio.sleep(3600)
+
+    return wait_forever
+
+
+def test_failed_session_load_cancels_the_intent_task(monkeypatch) -> None:
+    started: list[asyncio.Task] = []
+
+    async def broken_load(_: str) -> ConversationSession:
+        await asyncio.sleep(0)
+        raise RuntimeError("store misconfigured")
+
+    monkeypatch.setattr(main.settings, "single_call_mode", False)
+    monkeypatch.setattr(main.intent_classifier, "classify", _pending(started))
+    monkeypatch.setattr(main, "_safe_load_session", broken_load)
+
+    async def scenario() -> None:
+        with pytest.raises(RuntimeError):
+            await main._handle_chat(ChatRequest(user_id="u1", message="hola"))
+        await asyncio.sleep(0)
+        assert [task.cancelled() for task in started] == [True]
+
+    asyncio.run(scenario())
+
+
+def test_failed_turn_cancels_the_speculative_context_task(monkeypatch) -> None:
+    started: list[asyncio.Task] = []
+
+    async def load(user_id: str) -> ConversationSession:
+        return ConversationSession(user_id)
+
+    async def flush(_: ConversationSession) -> None:
+        return None
+
+    async def broken_classify(_: str) -> None:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("classifier down")
+
+    monkeypatch.setattr(main.settings, "single_call_mode", False)
+    monkeypatch.setattr(main.intent_classifier, "classify", broken_classify)
+    monkeypatch.setattr(main.agent_service, "prepare_context", _pending(started))
+    monkeypatch.setattr(main, "_safe_load_session", load)
+    monkeypatch.setattr(main, "_safe_flush_session", flush)
+
+    async def scenario() -> None:
+        with pytest.raises(RuntimeError):
+            await main._handle_chat(ChatRequest(user_id="u1", message="busco un toyota"))
+        await asyncio.sleep(0)
+        assert [task.cancelled() for task in started] == [True]
+
+    asyncio.run(scenario())
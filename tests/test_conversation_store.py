@@ -0,0 +1,110 @@
+"""Tests for conversation sessions and their compare-and-set flush."""
+import asyncio
+import json
+
+import pytest
+
+from app.services.conversation_store import (
+    AsyncConversationStore,
+    ConversationConflictError,
+    ConversationSession,
+    ConversationStore,
+)
+
+
+class _VersionedBlob:
+    """In-memory stand-in for the CAS script, with an optional concurrent writer."""
+
+    def __init__(self, state: dict | None = None, interleave: int = 0) -> None:
+        self.raw = json.dumps(state) if state is not None else None
+        self.interleave = interleave
+        self.calls = 0
+
+    def __call__(self, keys: list[str], args: list) -> list:
+        self.calls += 1
+        expected, payload, _ttl = args
+        if self.interleave:
+            self.interleave -= 1
+            current = json.loads(self.raw) if self.raw else {}
+            current["version"] = current.get("version", 0) + 1
+            current.setdefault("history", []).append({"ts": "other", "payload": {}})
+            self.raw = json.dumps(current)
+        version = json.loads(self.raw).get("version", 0) if self.raw else 0
+        if version != expected:
+            return [0, self.raw or ""]
+        self.raw = payload
+        return [1, ""]
+
+
+def _store(blob: _VersionedBlob) -> ConversationStore:
+    store = ConversationStore("redis://localhost:6379/0")
+    store._compare_and_set = blob
+    return store
+
+
+def test_session_flushes_all_mutations_in_one_write() -> None:
+    blob = _VersionedBlob({"preferences": {"make": "Toyota"}, "version": 4})
+    session = ConversationSession("u1", json.loads(blob.raw))
+    session.store_preferences({"max_price": 300000})
+    session.save_turn({"message": "hola"})
+    session.set_question("modelo", ["Corolla", "RAV4"])
+    session.set_expected_slot("modelo")
+
+    _store(blob).flush_session(session)
+
+    stored = json.loads(blob.raw)
+    assert blob.calls == 1
+    assert stored["version"] == 5
+    assert stored["preferences"] == {"make": "Toyota", "max_price": 300000}
+    assert stored["question"]["options"] == ["Corolla", "RAV4"]
+    assert not session.dirty
+
+
+def test_session_replays_operations_after_concurrent_write() -> None:
+    blob = _VersionedBlob({"version": 1}, interleave=1)
+    session = ConversationSession("u1", json.loads(blob.raw))
+    session.save_turn({"message": "mine"})
+
+    _store(blob).flush_session(session)
+
+    stored = json.loads(blob.raw)
+    assert stored["version"] == 3
+    assert [turn["ts"] for turn in stored["history"]][0] == "other"
+    assert stored["history"][-1]["payload"] == {"message": "mine"}
+
+    stubborn = _VersionedBlob({"version": 1}, interleave=10)
+    session = ConversationSession("u1", json.loads(stubborn.raw))
+    session.set_expected_slot("marca")
+    with pytest.raises(ConversationConflictError):
+        _store(stubborn).flush_session(session)
+
+
+def test_session_flush_keeps_integers_beyond_64_bits() -> None:
+    blob = _VersionedBlob({"version": 0})
+    session = ConversationSession("u1", json.loads(blob.raw))
+    session.store_preferences({"max_price": 10**20})
+
+    _store(blob).flush_session(session)
+
+    assert json.loads(blob.raw)["preferences"] == {"max_price": 10**20}
+    assert session.version == 1
+
+
+def test_async_store_flushes_with_the_same_semantics() -> None:
+    blob = _VersionedBlob({"version": 2}, interleave=1)
+
+    async def compare_and_set(keys: list[str], args: list) -> list:
+        return blob(keys, args)
+
+    async def scenario() -> None:
+        store = AsyncConversationStore("redis://localhost:6379/0", max_connections=4)
+        store._compare_and_set = compare_and_set
+        session = ConversationSession("u1", json.loads(blob.raw))
+        session.store_preferences({"make": "Mazda"})
+        await store.flush_session(session)
+        await store.close()
+
+    asyncio.run(scenario())
+    stored = json.loads(blob.raw)
+    assert stored["version"] == 4
+    assert stored["preferences"] == {"make": "Mazda"}
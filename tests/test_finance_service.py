@@ -1,7 +1,13 @@
 """Tests for financing calculations."""
+import numpy as np
 import pytest
 
-from app.services.finance_service import calculate_financing
+from app.services.finance_service import (
+    TERM_YEARS,
+    affordable_price,
+    calculate_financing,
+    calculate_financing_batch,
+)
 
 
 def test_calculate_financing_returns_expected_plan() -> None:
@@ -22,3 +28,18 @@ def test_calculate_financing_validates_input_ranges() -> None:
 
     with pytest.raises(ValueError):
         calculate_financing(price=100000, down_payment=10000, years=2)
+
+
+def test_batch_financing_matches_single_plans_for_every_term() -> None:
+    payments = calculate_financing_batch(
+        [300000, 180000, 50000], down_payments=[60000, 0, 50000], interest_rates=[0.1, 0.0]
+    )
+
+    assert payments.shape == (3, len(TERM_YEARS), 2)
+    for term, years in enumerate(TERM_YEARS):
+        assert payments[0, term, 0] == calculate_financing(300000, 60000, years).monthly_payment
+        assert payments[1, term, 1] == calculate_financing(180000, 0, years, interest_rate=0.0).monthly_payment
+    assert np.isnan(payments[2]).all()  # down payment covers the whole price
+
+    ceiling = affordable_price(6000, down_payment=20000)
+    assert calculate_financing(ceiling, 20000, max(TERM_YEARS)).monthly_payment == pytest.approx(6000, abs=0.01)
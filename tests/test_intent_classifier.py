@@ -0,0 +1,94 @@
+"""Tests for the local intent fast path and its caches."""
+import asyncio
+import json
+from pathlib import Path
+
+from app.services.cache import TieredCache, TTLCache
+from app.services.fast_intent import FastIntentClassifier, normalize
+from app.services.intent_classifier import IntentClassifier
+from app.services.metrics import METRICS
+
+
+def test_fast_path_answers_trivial_messages_without_the_llm() -> None:
+    METRICS.reset()
+    classifier = IntentClassifier(api_key=None)
+
+    assert asyncio.run(classifier.classify("¡Hola!")) == "greeting"
+    assert asyncio.run(classifier.classify("muchas gracias")) == "small_talk"
+    assert asyncio.run(classifier.classify("¿Cuánto de enganche necesito?")) == "financing"
+    assert asyncio.run(classifier.classify("Toyota")) == "ambiguous"
+    assert METRICS.snapshot()["intent.fast_path"] == 3
+
+
+def test_greeting_rule_only_accepts_filler_after_the_greeting() -> None:
+    classifier = IntentClassifier(api_key=None)
+
+    for message in ("hola amigo", "Buenas noches, equipo", "hola buenas tardes"):
+        assert asyncio.run(classifier.classify(message)) == "greeting"
+    # A make or model after the greeting is a request, so it goes to the next tier.
+    for message in ("hola toyota", "hola corolla", "buenas tardes mazda"):
+        assert asyncio.run(classifier.classify(message)) != "greeting"
+
+
+def test_bare_rate_questions_need_a_vehicle_to_count_as_financing() -> None:
+    classifier = IntentClassifier(api_key=None)
+
+    assert asyncio.run(classifier.classify("¿Qué tasa manejan para autos seminuevos?")) == "financing"
+    assert asyncio.run(classifier.classify("que tasa de interes manejan")) == "financing"
+    for message in ("tasa de cambio del dolar", "¿cuál es la tasa de desempleo?"):
+        assert asyncio.run(classifier.classify(message)) != "financing"
+
+
+def test_fast_path_learns_from_logged_samples(tmp_path: Path) -> None:
+    samples = tmp_path / "intents.ndjson"
+    samples.write_text(
+        "\n".join(json.dumps({"message": "tienen autos electricos", "intent": "recommendation"}) for _ in range(5)),
+        encoding="utf-8",
+    )
+
+    baseline = FastIntentClassifier().classify("autos electricos")
+    trained = FastIntentClassifier(str(samples)).classify("autos electricos")
+    assert trained[0] == "recommendation"
+    assert trained[1] > baseline[1]
+
+
+def test_fast_path_ignores_unknown_training_labels(tmp_path: Path) -> None:
+    samples = tmp_path / "intents.ndjson"
+    samples.write_text(
+        "\n".join(json.dumps({"message": "quiero vender mi auto", "intent": "sell_car"}) for _ in range(20)),
+        encoding="utf-8",
+    )
+    classifier = IntentClassifier(api_key=None, training_path=str(samples))
+
+    assert classifier.fast_path.classify("vender mi auto")[0] != "sell_car"
+    assert asyncio.run(classifier.classify("vender mi auto")) != "sell_car"
+
+    classifier.fast_path.model.train([("quiero vender mi auto", "sell_car")] * 20)
+    assert classifier.fast_path.classify("vender mi auto")[0] == "sell_car"
+    assert asyncio.run(classifier.classify_local("vender mi auto")) is None
+
+
+def test_tiered_cache_evicts_expires_and_counts_hits() -> None:
+    METRICS.reset()
+    local = TTLCache(max_entries=2, ttl_seconds=60)
+    local.set("a", "1")
+    local.set("b", "2")
+    local.get("a")
+    local.set("c", "3")
+    assert local.get("b") is None and local.get("a") == "1"
+
+    expired = TTLCache(max_entries=2, ttl_seconds=0)
+    expired.set("a", "1")
+    assert expired.get("a") is None
+
+    cache = TieredCache("intent", "v1", max_entries=8, ttl_seconds=60)
+
+    async def scenario() -> tuple[str | None, str | None]:
+        missing = await cache.get(normalize("¡Hola!"))
+        await cache.set(normalize("¡Hola!"), "greeting")
+        return missing, await cache.get(normalize("  hola "))
+
+    assert asyncio.run(scenario()) == (None, "greeting")
+    snapshot = METRICS.snapshot()
+    assert snapshot["cache.intent.miss"] == 1
+    assert snapshot["cache.intent.hit_local"] == 1
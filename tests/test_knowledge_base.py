@@ -0,0 +1,27 @@
+"""Tests for value-proposition retrieval."""
+from pathlib import Path
+
+from app.services.knowledge_base import KnowledgeBase
+
+_VALUE_PROPOSITION = Path(__file__).resolve().parents[1] / "app" / "data" / "value_proposition.md"
+
+
+def test_select_returns_matching_sections_within_budget() -> None:
+    knowledge_base = KnowledgeBase(_VALUE_PROPOSITION.read_text(encoding="utf-8"))
+    assert len(knowledge_base.sections) > 5
+
+    warranty = knowledge_base.select("¿Qué garantía tienen los autos?", token_budget=60)
+    assert len(warranty) == 1
+    assert "7 días o 300 km" in warranty[0].text
+
+    financing = knowledge_base.select("me pueden financiar", token_budget=250)
+    assert any("financiamiento" in section.text for section in financing)
+    assert sum(section.tokens for section in financing) <= 250
+
+
+def test_select_falls_back_to_leading_sections_only_when_asked() -> None:
+    knowledge_base = KnowledgeBase(_VALUE_PROPOSITION.read_text(encoding="utf-8"))
+
+    assert knowledge_base.select("hola", token_budget=250) == []
+    fallback = knowledge_base.select("hola", token_budget=80, fallback=True)
+    assert fallback == [knowledge_base.sections[0]]
@@ -0,0 +1,94 @@
+"""Tests for catalog-aware message parsing."""
+from pathlib import Path
+
+from app.domain.schemas import ChatRequest, InventoryDelta
+from app.domain.turn import TurnContext
+from app.services.catalog_service import CatalogService
+from app.services.message_parser import MessageParser
+from app.services.metrics import METRICS
+
+_SAMPLE_CSV = """stock_id,km,price,make,model,year,version,bluetooth,largo,ancho,altura,car_play
+123,10000,250000.0,Toyota,Corolla,2019,XLE,Sí,4630,1780,1435,Sí
+456,45000,180000.0,Nissan,Sentra,2017,Advance,,4615,1760,1500,
+789,30000,390000.0,Mazda,CX-5,2020,i Grand Touring,Sí,4550,1840,1680,Sí
+"""
+
+
+def _parser(tmp_path: Path) -> tuple[CatalogService, MessageParser]:
+    csv_path = tmp_path / "catalog.csv"
+    csv_path.write_text(_SAMPLE_CSV, encoding="utf-8")
+    catalog = CatalogService()
+    catalog.load_catalog(str(csv_path))
+    return catalog, MessageParser(catalog)
+
+
+def _preferences(parser: MessageParser, message: str) -> dict:
+    return parser.enrich_request(ChatRequest(user_id="u1", message=message)).preferences or {}
+
+
+def test_entities_are_found_in_one_pass_with_aliases(tmp_path: Path) -> None:
+    _, parser = _parser(tmp_path)
+
+    assert _preferences(parser, "Busco un corolla 2019") == {"make": "Toyota", "model": "Corolla", "min_year": 2019}
+    assert _preferences(parser, "me gusta la cx 5")["model"] == "CX-5"
+    assert _preferences(parser, "algo tipo cx5")["make"] == "Mazda"
+    assert _preferences(parser, "quiero un vw") == {"make": "Volkswagen"}
+    # A model from another make is ignored when the make is already known.
+    request = ChatRequest(user_id="u1", message="algo como un sentra", preferences={"make": "Toyota"})
+    assert "model" not in (parser.enrich_request(request).preferences or {})
+
+
+def test_matcher_is_rebuilt_when_the_catalog_changes(tmp_path: Path) -> None:
+    catalog, parser = _parser(tmp_path)
+    assert "model" not in _preferences(parser, "tienen jetta?")
+
+    catalog.apply_deltas(
+        [
+            InventoryDelta(
+                op="upsert", stock_id="999", km=5000, price=320000.0, make="Volkswagen", model="Jetta", year=2022
+            )
+        ]
+    )
+    assert _preferences(parser, "tienen jetta?") == {"make": "Volkswagen", "model": "Jetta"}
+
+
+def test_misspelled_makes_and_models_resolve_with_a_confidence(tmp_path: Path) -> None:
+    _, parser = _parser(tmp_path)
+    METRICS.reset()
+
+    assert _preferences(parser, "busco un toyta corola") == {"make": "Toyota", "model": "Corolla"}
+    assert _preferences(parser, "algo como un nisan") == {"make": "Nissan"}
+    # Five-letter names sit too close to everyday words and are only matched exactly.
+    assert _preferences(parser, "una masda") == {}
+    matches = parser.matcher.fuzzy.resolve("corola", min_confidence=0.8)
+    assert [(match.value, round(match.confidence, 2)) for match in matches] == [("Corolla", 0.86)]
+    assert METRICS.snapshot()["parser.fuzzy_model"] == 1
+
+
+def test_numbers_are_typed_once_so_distances_and_prices_do_not_leak_into_years(tmp_path: Path) -> None:
+    _, parser = _parser(tmp_path)
+
+    message = "Corolla con menos de 80,000 km, tengo 200000 y 50 mil de enganche a 4 años"
+    request = ChatRequest(user_id="u1", message=message)
+    enriched = parser.enrich_request(request)
+    assert enriched.preferences == {"make": "Toyota", "model": "Corolla", "max_km": 80000, "max_price": 200000.0}
+    assert enriched.financing is not None
+    assert (enriched.financing.car_price, enriched.financing.down_payment, enriched.financing.years) == (
+        200000.0,
+        50000.0,
+        4,
+    )
+    assert _preferences(parser, "un 2018 o 2020 de 350k") == {"min_year": 2018, "max_price": 350000.0}
+    assert parser.parse(message) is parser.parse(message)
+
+
+def test_enrich_fills_the_turn_in_place_and_records_it_like_a_request(tmp_path: Path) -> None:
+    _, parser = _parser(tmp_path)
+    request = ChatRequest(user_id="u1", message="un corolla, 300 mil a 3 años", preferences={"max_km": 50000})
+    turn = TurnContext.from_request(request)
+
+    assert parser.enrich(turn) is turn
+    assert turn.preferences == {"max_km": 50000, "make": "Toyota", "model": "Corolla", "max_price": 300000.0}
+    assert request.preferences == {"max_km": 50000}
+    assert turn.to_record() == parser.enrich_request(request).model_dump()
+    assert "plazo en años" not in parser.identify_missing_fields(turn)